@@ -0,0 +1,76 @@
+"""Currency normalization of a sheet in ten currencies.
+
+    python benchmarks/bench_currency.py
+
+The whole load_data reading the ``In main currency`` column of the sheet, and
+with that column dropped, converting every amount with the daily FX rates.
+Then the conversion alone: the as-of merge, and the lookup of the rate of each
+row in a dict of sorted lists ("per row", timed on a sample and scaled).
+"""
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from common import best_of
+from engine import convert_currency, load_data, parse_amounts, parse_dates
+from utility.artificial_data import CURRENCIES, fx_rates, generate
+
+START, END = "2015-01-01", "2024-12-31"
+
+
+def per_row(amount: pd.Series, dates: pd.Series, currencies: pd.Series, rates) -> list:
+    table = {}
+    for currency, group in rates.groupby("currency"):
+        table[currency] = (list(group.date), list(group.rate))
+
+    converted = []
+    for value, date, currency in zip(amount, dates, currencies):
+        if currency not in table:
+            converted.append(value)
+            continue
+        days, values = table[currency]
+        i = max(bisect.bisect_right(days, date) - 1, 0)
+        converted.append(value * values[i])
+    return converted
+
+
+def main():
+    raw_rates = fx_rates(CURRENCIES, START, END)
+    rates = raw_rates.assign(
+        date=pd.to_datetime(raw_rates.date), rate=raw_rates.rate.astype(float)
+    )
+
+    print(
+        f"{'rows':>10} {'load, main (s)':>15} {'load, fx (s)':>13}"
+        f" {'as-of merge (s)':>16} {'per row (s)':>12}"
+    )
+    for rows in (10_000, 100_000, 1_000_000):
+        sheet = generate(rows, START, END, currencies=CURRENCIES)
+        foreign = sheet.drop(columns="In main currency")
+
+        main_column = load_data(sheet)
+        converted = load_data(foreign, rates)
+        np.testing.assert_allclose(converted.amount, main_column.amount, rtol=1e-2)
+
+        amount = parse_amounts(foreign["Amount"])
+        dates = parse_dates(foreign["Date"])
+        currencies = foreign["Currency"]
+
+        repeat = 3 if rows < 1_000_000 else 1
+        main = best_of(lambda: load_data(sheet), repeat)
+        table = best_of(lambda: load_data(foreign, rates), repeat)
+        merge = best_of(lambda: convert_currency(amount, dates, currencies, rates), repeat)
+
+        sample = min(rows, 20_000)
+        row = best_of(
+            lambda: per_row(amount[:sample], dates[:sample], currencies[:sample], rates), 1
+        )
+        print(
+            f"{rows:>10} {main:>15.3f} {table:>13.3f} {merge:>16.3f}"
+            f" {row * rows / sample:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
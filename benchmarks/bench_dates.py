@@ -0,0 +1,55 @@
+"""Compare the date parsing of load_data with the previous per-element inference.
+
+    python benchmarks/bench_dates.py
+
+The synthetic sheets have one date per day over ten years, a few thousand
+distinct strings. The "edited" column has one row in a thousand written in
+another format, parsed by the fallback.
+"""
+import numpy as np
+import pandas as pd
+
+from common import best_of, synthetic_sheet
+from engine import parse_dates
+
+
+def legacy_parse_dates(dates: pd.Series) -> pd.Series:
+    return pd.to_datetime(dates, dayfirst=True)
+
+
+def edited(dates: pd.Series) -> pd.Series:
+    dates = dates.copy()
+    rows = dates.index[::1000]
+    dates[rows] = pd.to_datetime(dates[rows], dayfirst=True).dt.strftime("%Y-%m-%d")
+    return dates
+
+
+def main():
+    print(f"{'rows':>10} {'sheet':>8} {'legacy (s)':>12} {'unique (s)':>12} {'speedup':>8}")
+    for rows in (10_000, 100_000, 1_000_000):
+        dates = synthetic_sheet(rows)["Date"]
+
+        repeat = 3 if rows < 1_000_000 else 1
+        for name, column in (("plain", dates), ("edited", edited(dates))):
+            if name == "plain":
+                pd.testing.assert_series_equal(
+                    parse_dates(column), legacy_parse_dates(column)
+                )
+            else:
+                # the legacy parser raises on a sheet with mixed formats
+                assert not parse_dates(column).isna().any()
+            legacy = best_of(
+                lambda: pd.to_datetime(column, format="mixed", dayfirst=True)
+                if name == "edited"
+                else legacy_parse_dates(column),
+                repeat,
+            )
+            unique = best_of(lambda: parse_dates(column), repeat)
+            print(
+                f"{rows:>10} {name:>8} {legacy:>12.3f} {unique:>12.3f}"
+                f" {legacy / unique:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Download of a sheet from the local gviz stand-in, bare urllib against the client.
+
+    python benchmarks/bench_fetch.py
+
+``pd.read_csv(url)`` opens a new connection for every request and gets the
+plain CSV, the client keeps the connection alive and gets a gzip body parsed
+while it is decompressed. On the loopback the bandwidth is free and the server
+spends the time saved compressing, the bytes on the wire are what a real link
+pays for. The last columns are a burst of small requests to a small sheet, as
+made by the incremental sync.
+"""
+import pandas as pd
+
+from common import best_of, synthetic_sheet
+from fetch import Client
+from utility.fake_sheet_server import FakeSheetServer
+
+
+def main():
+    print(
+        f"{'rows':>10} {'CSV (MB)':>9} {'wire (MB)':>10} {'urllib (s)':>11}"
+        f" {'client (s)':>11} {'20 small, urllib (s)':>21} {'client (s)':>11}"
+    )
+    for rows in (10_000, 100_000, 1_000_000):
+        text = synthetic_sheet(rows).to_csv(index=False)
+        sheets = {"bench": text, "small": synthetic_sheet(100).to_csv(index=False)}
+        with FakeSheetServer(sheets) as server:
+            url = f"{server.url}/spreadsheets/d/{{}}/gviz/tq?tqx=out:csv&sheet=Transactions"
+            small = [
+                url.format("small") + f"&headers=1&tq=select%20*%20offset%20{offset}"
+                for offset in range(20)
+            ]
+            url = url.format("bench")
+            client = Client()
+
+            repeat = 3 if rows < 1_000_000 else 1
+            urllib = best_of(lambda: pd.read_csv(url, dtype=str), repeat)
+            pooled = best_of(lambda: client.read_csv(url, dtype=str), repeat)
+            wire = client.last().wire_bytes
+
+            urllib_small = best_of(lambda: [pd.read_csv(u, dtype=str) for u in small], repeat)
+            pooled_small = best_of(lambda: [client.read_csv(u, dtype=str) for u in small], repeat)
+            print(
+                f"{rows:>10} {len(text) / 2**20:>9.1f} {wire / 2**20:>10.1f} {urllib:>11.3f}"
+                f" {pooled:>11.3f} {urllib_small:>21.3f} {pooled_small:>11.3f}"
+            )
+            client.pool.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare the vectorized load_data with the previous row-wise implementation.
+
+    python benchmarks/bench_load_data.py
+"""
+import re
+
+import pandas as pd
+from pandas import DataFrame
+
+from common import best_of, synthetic_sheet
+from visualizer import load_data
+
+
+def legacy_load_data(df: DataFrame) -> DataFrame:
+    df = df[["Date", "Category", "Amount", "Account", "Description"]]
+    df = df.rename(columns={col: col.lower() for col in df.columns})
+    df = df.query("category != 'Transfer'")
+    df["amount"] = df["amount"].apply(
+        lambda value: value.replace(",", ".") if isinstance(value, str) else value
+    )
+    df["date"] = pd.to_datetime(df["date"], dayfirst=True)
+    df["amount"] = pd.to_numeric(df["amount"])
+    df["expense"] = df["amount"].apply(lambda value: value < 0)
+    df["amount"] = df["amount"].apply(abs)
+    df["tags"] = df["description"].apply(
+        lambda desc: re.findall("#([a-zA-Z0-9_-]+)", desc)
+        if isinstance(desc, str)
+        else []
+    )
+    df["description"] = df["description"].apply(
+        lambda desc: re.sub("#([a-zA-Z0-9_-]+)", "", desc)
+        if isinstance(desc, str)
+        else []
+    )
+    return df
+
+
+def main():
+    pd.options.mode.chained_assignment = None
+
+    print(f"{'rows':>10} {'stage':>12} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for rows in (10_000, 100_000, 1_000_000):
+        sheet = synthetic_sheet(rows)
+        # same rows, load_data also sorts them by date and adds the period keys
+        pd.testing.assert_frame_equal(
+            legacy_load_data(sheet),
+            load_data(sheet).drop(columns=["year", "month"]).sort_index(),
+        )
+
+        # date parsing is timed by bench_dates.py, time the rest of the stage without it
+        parsed = sheet.assign(Date=pd.to_datetime(sheet["Date"], dayfirst=True))
+
+        repeat = 3 if rows < 1_000_000 else 1
+        for stage, df in (("total", sheet), ("w/o dates", parsed)):
+            legacy = best_of(lambda: legacy_load_data(df), repeat)
+            vectorized = best_of(lambda: load_data(df), repeat)
+            print(
+                f"{rows:>10} {stage:>12} {legacy:>12.3f} {vectorized:>15.3f}"
+                f" {legacy / vectorized:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Latency of the rerun that follows a change of a widget of the expenses section.
+
+    python benchmarks/bench_rerun.py
+
+Before the fragments the whole script ran again: the sheet was normalized,
+the dataset rebuilt and every section rendered. Now only the fragment of the
+section reruns, on the dataset shared through the cache, and a filter state
+already seen is served by the memo of the dataset. Streamlit runs in bare
+mode, the elements are built but not sent anywhere.
+"""
+import logging
+
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+
+from common import best_of
+from dataset import Dataset
+from suite import sheet
+from visualizer import (category_inspector_section, incomes_expenses_section,
+                        load_dataset, overview_section)
+
+
+def full_rerun(raw: pd.DataFrame):
+    data = load_dataset(raw)
+    overview_section(data)
+    incomes_expenses_section(data, "expenses")
+    incomes_expenses_section(data, "incomes")
+    category_inspector_section(data)
+
+
+def fragment_rerun(data: Dataset):
+    # a new filter state, the memoized frames are dropped
+    data.__dict__.pop("memo", None)
+    incomes_expenses_section(data, "expenses")
+
+
+def main():
+    streamlit.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level(logging.ERROR)
+    pd.options.mode.chained_assignment = None
+
+    print(f"{'rows':>10} {'full rerun (s)':>15} {'fragment (s)':>13} {'memo hit (s)':>13}")
+    for years, rows in ((5, 10_000), (10, 100_000), (20, 1_000_000)):
+        raw = sheet(years, rows)
+        data = load_dataset(raw)
+        # the split of the dataset is memoized by the first full run
+        incomes_expenses_section(data, "expenses")
+
+        repeat = 3 if rows < 1_000_000 else 1
+        before = best_of(lambda: full_rerun(raw), repeat)
+        after = best_of(lambda: fragment_rerun(data), repeat)
+        hit = best_of(lambda: incomes_expenses_section(data, "expenses"), repeat)
+        print(f"{rows:>10} {before:>15.3f} {after:>13.3f} {hit:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
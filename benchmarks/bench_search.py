@@ -0,0 +1,53 @@
+"""Search of the descriptions, inverted index against a substring scan.
+
+    python benchmarks/bench_search.py
+
+The build of the index of a dataset (once per sheet version), then the mean
+time of a few queries answered by the index and by a scan, ``str.contains`` on
+the descriptions and a prefix test on the tags table.
+"""
+import numpy as np
+
+from common import best_of, synthetic_sheet
+from dataset import Dataset
+from engine import load_data
+
+QUERIES = ["pizza", "tra", "#work", "din fri"]
+
+
+def scan(data: Dataset, query: str) -> np.ndarray:
+    df = data.transactions
+    tags = data.tags.tag.astype(str).str.lower()
+    words = df.description.where(df.description.map(type) == str).str.lower()
+
+    mask = np.ones(len(df), dtype=bool)
+    for term in query.lower().split():
+        rows = data.tags.row[tags.str.startswith(term.lstrip("#")).to_numpy()]
+        found = df.index.isin(rows)
+        if not term.startswith("#"):
+            found |= words.str.contains(rf"\b{term}", na=False).to_numpy(dtype=bool)
+        mask &= found
+    return df.index[mask].to_numpy()
+
+
+def main():
+    print(f"{'rows':>10} {'build (s)':>10} {'index (ms)':>11} {'scan (ms)':>10}")
+    for rows in (10_000, 100_000, 1_000_000):
+        data = Dataset.from_transactions(load_data(synthetic_sheet(rows)))
+        for query in QUERIES:
+            np.testing.assert_array_equal(
+                np.sort(data.search.rows(query)), np.sort(scan(data, query))
+            )
+
+        repeat = 3 if rows < 1_000_000 else 1
+        build = best_of(lambda: Dataset.from_transactions(data.transactions).search, repeat)
+        index = best_of(lambda: [data.search.rows(q) for q in QUERIES], 5)
+        brute = best_of(lambda: [scan(data, q) for q in QUERIES], repeat)
+        print(
+            f"{rows:>10} {build:>10.3f} {index / len(QUERIES) * 1000:>11.2f}"
+            f" {brute / len(QUERIES) * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
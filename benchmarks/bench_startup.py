@@ -0,0 +1,91 @@
+"""Cold import time of the entry points, fails when over budget.
+
+    python benchmarks/bench_startup.py --budget-ms 100
+
+Every entry point is imported in a fresh interpreter with ``python -X importtime``.
+Streamlit is needed to draw the URL box, the budget applies to the time spent
+importing everything else. The heavy libraries must not be imported by our
+modules (streamlit itself loads part of plotly), they are loaded on first use.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+ENTRY_POINTS = ["app", "local"]
+LAZY = ["pandas", "numpy", "pyarrow", "plotly", "urllib3"]
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Cumulative import time, in microseconds, of the top level imports of ``module``"""
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    script = f"import {module}, sys; print(*sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        # depth 1 and 2, the module and what it imports directly
+        if match and len(match.group(3)) <= 3:
+            times[match.group(4)] = times.get(match.group(4), 0) + int(match.group(2))
+    times["__modules__"] = result.stdout.split()
+    return times
+
+
+def measure(module: str, repeat: int, preloaded: Sequence[str] = ()) -> dict:
+    runs = [import_times(module) for _ in range(repeat)]
+    best = min(runs, key=lambda t: t.get(module, 0))
+    total = best.get(module, 0)
+    streamlit = best.get("streamlit", 0)
+    return dict(
+        module=module,
+        total_ms=total / 1000,
+        streamlit_ms=streamlit / 1000,
+        own_ms=(total - streamlit) / 1000,
+        eager=[
+            lib for lib in LAZY if lib in best["__modules__"] and lib not in preloaded
+        ],
+    )
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(args)
+
+    preloaded = import_times("streamlit")["__modules__"]
+
+    failures = []
+    print(f"{'entry point':>12} {'total (ms)':>11} {'streamlit':>10} {'own':>8}  eager imports")
+    for module in ENTRY_POINTS:
+        result = measure(module, args.repeat, preloaded)
+        print(
+            f"{module:>12} {result['total_ms']:>11.1f} {result['streamlit_ms']:>10.1f}"
+            f" {result['own_ms']:>8.1f}  {', '.join(result['eager']) or '-'}"
+        )
+        if result["own_ms"] > args.budget_ms:
+            failures.append(f"{module}: {result['own_ms']:.1f} ms over {args.budget_ms} ms")
+        if result["eager"]:
+            failures.append(f"{module}: imports {', '.join(result['eager'])} at startup")
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
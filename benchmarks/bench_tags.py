@@ -0,0 +1,94 @@
+"""Compare the tag table aggregations with the previous row-wise implementation.
+
+    python benchmarks/bench_tags.py
+"""
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from common import best_of, synthetic_sheet
+from dataset import build_tag_table, tags_of
+from utils import _tag
+from visualizer import aggregate_tags_values, load_data
+
+
+def legacy_aggregate_tags_values(df: DataFrame) -> DataFrame:
+    tags = list()
+    values = list()
+
+    def _mark_tags(row: pd.Series):
+        for row_tag in row.tags:
+            tags.append(row_tag)
+            values.append(row.amount)
+        return row
+
+    df = df.apply(_mark_tags, axis=1)
+    df_summary = (
+        pd.DataFrame({"tag": tags, "values": values})
+        .groupby("tag")
+        .agg(tag=("tag", "first"), value=("values", "sum"))
+    )
+    if not df_summary.empty:
+        df_summary["impact"] = (df_summary.value / df["amount"].sum()) * 100
+        df_summary["tag"] = df_summary["tag"].apply(_tag)
+    return df_summary
+
+
+def legacy_exclude(df: DataFrame, ignored_tags) -> DataFrame:
+    return df[~df.tags.apply(lambda t: len(set(t).intersection(set(ignored_tags))) > 0)]
+
+
+def exclude(df: DataFrame, tag_table: DataFrame, ignored_tags) -> DataFrame:
+    ignored_rows = tag_table.row[tag_table.tag.isin(ignored_tags)]
+    return df[~df.index.isin(ignored_rows)]
+
+
+def tagged_sheet(rows: int, seed: int = 0) -> DataFrame:
+    """Sheet where most of the rows carry two to four tags"""
+    return synthetic_sheet(
+        rows, seed, tagged_share=0.9, tags_per_row=(0.2, 0.4, 0.3, 0.1)
+    )
+
+
+def main():
+    print(f"{'rows':>10} {'operation':>12} {'legacy (s)':>12} {'tag table (s)':>14} {'speedup':>8}")
+    for rows in (10_000, 100_000, 1_000_000):
+        df = load_data(tagged_sheet(rows))
+        df = df[df.expense]
+        tag_table = build_tag_table(df)
+        # tags of the generated vocabulary, a frequent one and two seldom ones
+        ignored = ["friends", "work", "project1"]
+
+        legacy, summary = legacy_aggregate_tags_values(df), aggregate_tags_values(df, tag_table)
+        assert list(legacy.tag) == list(summary.tag)
+        assert np.allclose(legacy.value, summary.value)
+        kept = exclude(df, tag_table, ignored)
+        assert legacy_exclude(df, ignored).index.equals(kept.index)
+        assert len(kept) < len(df)
+
+        repeat = 3 if rows < 1_000_000 else 1
+        operations = (
+            (
+                "aggregate",
+                lambda: legacy_aggregate_tags_values(df),
+                lambda: aggregate_tags_values(df, tag_table),
+            ),
+            ("exclude", lambda: legacy_exclude(df, ignored), lambda: exclude(df, tag_table, ignored)),
+            (
+                "list tags",
+                lambda: set(tag for tags in list(df.tags) for tag in tags),
+                lambda: tags_of(tag_table, df).tag.unique(),
+            ),
+        )
+        for name, legacy_fn, fn in operations:
+            legacy = best_of(legacy_fn, repeat)
+            new = best_of(fn, repeat)
+            print(f"{rows:>10} {name:>12} {legacy:>12.3f} {new:>14.3f} {legacy / new:>7.1f}x")
+
+        # paid once by load_dataset
+        build = best_of(lambda: build_tag_table(df), repeat)
+        print(f"{rows:>10} {'build table':>12} {'-':>12} {build:>14.3f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
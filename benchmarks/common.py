@@ -0,0 +1,27 @@
+"""Helpers shared by the benchmark scripts"""
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+from pandas import DataFrame
+
+# the app modules import each other as top-level modules (see src/local.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def synthetic_sheet(rows: int, seed: int = 0, **kwargs) -> DataFrame:
+    """Raw sheet as returned by the gviz endpoint, ten years of transactions"""
+    from utility.artificial_data import generate
+
+    return generate(rows, start="2015-01-01", end="2024-12-31", seed=seed, **kwargs)
+
+
+def best_of(fn: Callable, repeat: int = 3) -> float:
+    """Best wall time of ``repeat`` calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
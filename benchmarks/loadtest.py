@@ -0,0 +1,264 @@
+"""Concurrent sessions of the app against a synthetic sheet, as concurrency grows.
+
+    python benchmarks/loadtest.py --rows 100000 --sessions 1 2 4 8
+    python benchmarks/loadtest.py --sessions 4 --visits 3 --output loadtest.json
+
+The sheet is served by the local fake gviz server. Every session is an
+``AppTest`` of ``src/app.py`` driven from its own thread, all of them in this
+process like the sessions of one streamlit worker: the sheet cache and the
+dataset are shared. A visit goes through the widgets of every section (month
+and comparison of the overview, log scales, the rolling window of the Overall
+tab, period and excluded categories of incomes and expenses, the inspector),
+a step is one rerun. The tabs are rendered by every run, switching tab is a
+client-side change: the visit uses the widgets of each tab instead.
+
+``AppTest`` reruns the whole script on a widget change, where the browser
+reruns the fragment of the section only: the latencies are an upper bound.
+The memory is the growth of the resident set while the sessions are alive,
+divided by the number of sessions.
+"""
+import argparse
+import ctypes
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import common  # noqa: F401, puts src/ on the path
+from engine import ROLLING_WINDOWS
+
+APP = str(Path(__file__).resolve().parent.parent / "src" / "app.py")
+SHEET_ID = "loadtest0000"
+URL = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit"
+WORDS = ["pizza", "train", "rent", "gift", "#friends", "#work"]
+
+Step = Tuple[str, Callable]
+
+
+def rss() -> int:
+    """Resident memory of the process, in bytes (the peak where /proc is missing).
+
+    The garbage is collected and the free heap given back to the system first,
+    so that the value follows the live objects.
+    """
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _pick(rng: random.Random, widget):
+    return widget.select_index(rng.randrange(len(widget.options)))
+
+
+def visit(rng: random.Random) -> List[Step]:
+    """Interactions of a user going through the dashboard, one rerun each"""
+
+    def flip(key: str):
+        return lambda at: at.toggle(key=key).set_value(not at.toggle(key=key).value)
+
+    def exclude(at):
+        # one category excluded, or the exclusion removed
+        widget = at.multiselect(key="dont_True_category")
+        if widget.value:
+            return widget.set_value([])
+        return widget.select(rng.choice(widget.options))
+
+    return [
+        ("month", lambda at: _pick(rng, at.selectbox(key="selectbox_month_overview"))),
+        ("compare", lambda at: _pick(rng, at.selectbox(key="respect_to"))),
+        ("year_log_scale", flip("plot_summary_year")),
+        (
+            "overall_window",
+            lambda at: at.radio(key="overall_window").set_value(rng.choice(ROLLING_WINDOWS)),
+        ),
+        (
+            "plot_by",
+            lambda at: at.radio(key="sort_expenses").set_value(rng.choice(["Year", "Month"])),
+        ),
+        ("period", lambda at: _pick(rng, at.selectbox(key="selectbox_expenses"))),
+        ("log_scale", flip("plot_expenses")),
+        ("exclude_category", exclude),
+        ("incomes_period", lambda at: _pick(rng, at.selectbox(key="selectbox_incomes"))),
+        (
+            "inspector_search",
+            lambda at: at.text_input(key="search_expenses").input(rng.choice(WORDS)),
+        ),
+    ]
+
+
+def share_runtime():
+    """Patch AppTest for sessions in threads.
+
+    A run of AppTest sets the ``global.appTest`` option and a mock runtime,
+    then restores the option and clears the runtime when done: the first
+    session to finish would break the runs of the others. A server has a
+    single runtime for all its sessions, the last one set is kept.
+    """
+    import streamlit.config
+    from streamlit.runtime import Runtime
+
+    streamlit.config.set_option("global.appTest", True)
+    latest = []
+
+    def instance(cls) -> Runtime:
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+        elif not latest:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or latest[0]
+
+    Runtime.instance = classmethod(instance)
+
+
+class Session:
+    def __init__(self, seed: int, timeout: float):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = random.Random(seed)
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.at.session_state.url = URL
+        self.latencies: List[Tuple[str, float]] = []
+        self.errors: List[str] = []
+
+    def _run(self, name: str, action: Optional[Callable] = None):
+        start = time.perf_counter()
+        (action(self.at) if action is not None else self.at).run()
+        self.latencies.append((name, time.perf_counter() - start))
+        self.errors += [f"{name}: {e.value}" for e in self.at.exception]
+
+    def play(self, visits: int, start: threading.Barrier):
+        start.wait()
+        self._run("open")
+        for _ in range(visits):
+            for name, action in visit(self.rng):
+                try:
+                    self._run(name, action)
+                except Exception as exc:
+                    # a widget missing after a failed run
+                    self.errors.append(f"{name}: {exc!r}")
+
+
+def run_level(sessions: int, visits: int, timeout: float, seed: int) -> Dict:
+    before = rss()
+
+    players = [Session(seed + i, timeout) for i in range(sessions)]
+    barrier = threading.Barrier(sessions)
+    threads = [
+        threading.Thread(target=p.play, args=(visits, barrier), name=f"session {i}")
+        for i, p in enumerate(players)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    # measured while the sessions are alive
+    alive = rss()
+    opens = [s for p in players for name, s in p.latencies if name == "open"]
+    reruns = [s for p in players for name, s in p.latencies if name != "open"]
+    errors = [e for p in players for e in p.errors]
+    p50, p95, p99 = np.percentile(reruns, [50, 95, 99]) if reruns else (np.nan,) * 3
+    return dict(
+        sessions=sessions,
+        reruns=len(reruns),
+        open_s=float(np.median(opens)),
+        p50_s=float(p50),
+        p95_s=float(p95),
+        p99_s=float(p99),
+        max_s=float(max(reruns, default=np.nan)),
+        reruns_per_s=len(reruns) / wall,
+        mb_per_session=(alive - before) / sessions / 2**20,
+        rss_mb=alive / 2**20,
+        errors=errors,
+    )
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--visits", type=int, default=2, help="visits of every session")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds per rerun")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(args)
+
+    # the cache and the logs of the app go to a throwaway home, set before the
+    # app modules are imported (suite imports them)
+    home = tempfile.TemporaryDirectory(prefix="telexpense-loadtest-")
+    os.environ["HOME"] = home.name
+
+    import streamlit.logger
+
+    from suite import sheet
+    from utility.fake_sheet_server import FakeSheetServer
+
+    streamlit.logger.set_log_level(logging.ERROR)
+    share_runtime()
+
+    text = sheet(args.years, args.rows, seed=args.seed).to_csv(index=False)
+    with FakeSheetServer({SHEET_ID: text}) as server:
+        os.environ["TELEXPENSE_VIZ_GVIZ_URL"] = server.url
+
+        # the first session downloads and normalizes the sheet for all the
+        # others, its visit builds what the sessions share (memos, search index).
+        # It stays open, freeing it would offset the memory of the first level
+        warmup = Session(args.seed, args.timeout)
+        warmup.play(1, threading.Barrier(1))
+        print(
+            f"first load {warmup.latencies[0][1]:.2f} s, {server.requests} request(s),"
+            f" {len(warmup.errors)} errors"
+        )
+
+        print(
+            f"{'sessions':>8} {'reruns':>7} {'open (s)':>9} {'p50 (s)':>8} {'p95 (s)':>8}"
+            f" {'p99 (s)':>8} {'max (s)':>8} {'reruns/s':>9} {'MB/session':>11}"
+            f" {'RSS (MB)':>9} {'errors':>7}"
+        )
+        results = []
+        for sessions in args.sessions:
+            result = run_level(sessions, args.visits, args.timeout, args.seed)
+            results.append(result)
+            print(
+                f"{sessions:>8} {result['reruns']:>7} {result['open_s']:>9.3f}"
+                f" {result['p50_s']:>8.3f} {result['p95_s']:>8.3f} {result['p99_s']:>8.3f}"
+                f" {result['max_s']:>8.3f} {result['reruns_per_s']:>9.2f}"
+                f" {result['mb_per_session']:>11.1f} {result['rss_mb']:>9.0f}"
+                f" {len(result['errors']):>7}",
+                flush=True,
+            )
+            for error in result["errors"][:5]:
+                print(f"    {error}")
+
+    if args.output is not None:
+        meta = dict(rows=args.rows, years=args.years, visits=args.visits, cpus=os.cpu_count())
+        args.output.write_text(json.dumps(dict(meta=meta, results=results), indent=1))
+    home.cleanup()
+
+    if any(result["errors"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
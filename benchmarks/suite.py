@@ -0,0 +1,135 @@
+"""Time the loading stage and every section of the dashboard on synthetic sheets.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --output new.json --compare results.json
+
+The sections run against Streamlit in bare mode: widgets return their default
+value and the elements are built but not sent anywhere.
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+
+from common import best_of
+from utility.artificial_data import generate
+from visualizer import (aggregate_tags_values, category_inspector_section,
+                        incomes_expenses_section, load_data, load_dataset,
+                        overview_section)
+
+# (years of history, transactions)
+SIZES = [(1, 1_000), (5, 10_000), (10, 100_000), (20, 1_000_000)]
+
+
+def sheet(years: int, rows: int, seed: int = 0) -> pd.DataFrame:
+    # the history ends today, the month overview starts on the current month
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=years) + pd.Timedelta(days=1)
+    return generate(rows, start.date().isoformat(), end.date().isoformat(), seed=seed)
+
+
+def run_size(years: int, rows: int, repeat: int) -> Dict[str, float]:
+    raw = sheet(years, rows)
+    data = load_dataset(raw)
+    df = data.transactions
+
+    # a copy of the dataset has empty memos, the sections compute everything
+    cold = lambda: replace(data)
+    stages = {
+        "load_data": lambda: load_data(raw),
+        "load_dataset": lambda: load_dataset(raw),
+        "aggregate_tags_values": lambda: aggregate_tags_values(df, data.tags),
+        "overview_section": lambda: overview_section(cold()),
+        "incomes_expenses_section": lambda: incomes_expenses_section(cold(), "expenses"),
+        "category_inspector_section": lambda: category_inspector_section(cold()),
+    }
+    return {stage: best_of(fn, repeat) for stage, fn in stages.items()}
+
+
+def run(sizes: Sequence[Tuple[int, int]], repeat: int) -> dict:
+    results = []
+    for years, rows in sizes:
+        timings = run_size(years, rows, repeat if rows < 1_000_000 else 1)
+        for stage, seconds in timings.items():
+            results.append(dict(years=years, rows=rows, stage=stage, seconds=seconds))
+            print(f"{years:>3}y {rows:>9} {stage:>28} {seconds:>9.4f}s", flush=True)
+
+    return dict(
+        meta=dict(
+            created=datetime.now().isoformat(timespec="seconds"),
+            python=platform.python_version(),
+            pandas=pd.__version__,
+            machine=platform.machine(),
+        ),
+        results=results,
+    )
+
+
+def compare(
+    current: dict, baseline: dict, tolerance: float, min_delta: float = 0.0
+) -> List[dict]:
+    """Stages slower than the baseline by more than ``tolerance`` (0.25 = 25%).
+
+    Changes under ``min_delta`` seconds are timing noise and never flagged.
+    """
+    key = lambda r: (r["years"], r["rows"], r["stage"])
+    base = {key(r): r["seconds"] for r in baseline["results"]}
+
+    regressions = []
+    print(f"\n{'size':>14} {'stage':>28} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in current["results"]:
+        if key(result) not in base:
+            continue
+        ratio = result["seconds"] / base[key(result)]
+        flag = ratio > 1 + tolerance and result["seconds"] - base[key(result)] > min_delta
+        print(
+            f"{result['years']:>3}y {result['rows']:>9} {result['stage']:>28}"
+            f" {base[key(result)]:>9.4f}s {result['seconds']:>9.4f}s {ratio:>6.2f}x"
+            + ("  REGRESSION" if flag else "")
+        )
+        if flag:
+            regressions.append(dict(result, baseline=base[key(result)], ratio=ratio))
+    return regressions
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results.json"))
+    parser.add_argument("--compare", type=Path, help="baseline results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-delta", type=float, default=0.005, help="seconds, ignore smaller changes"
+    )
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(args)
+
+    # bare mode complains about the missing runtime on every call
+    streamlit.config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level(logging.ERROR)
+    pd.options.mode.chained_assignment = None
+
+    sizes = [(years, rows) for years, rows in SIZES if rows <= args.max_rows]
+    current = run(sizes, args.repeat)
+    args.output.write_text(json.dumps(current, indent=2))
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(current, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Set,
+                    Tuple)
+
+from utils import get_cache_dir_path
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+DEFAULT_TTL = 15 * 60  # seconds
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+# deep sizes of the frames already measured, cached frames are never modified
+_frame_sizes: Dict[int, Tuple[weakref.ref, int]] = {}
+
+
+def _frame_nbytes(df: Any) -> int:
+    key = id(df)
+    entry = _frame_sizes.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    _frame_sizes[key] = (weakref.ref(df, lambda _: _frame_sizes.pop(key, None)), size)
+    return size
+
+
+def nbytes(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """Deep memory usage of the frames and arrays held by ``value``: a frame, an
+    array, a container of them or an object with them as attributes, e.g. a
+    Dataset with its memo and search index. Shared objects count once"""
+    import numpy as np
+    from pandas import DataFrame, Series
+
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, (DataFrame, Series)):
+        return _frame_nbytes(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        value = list(value.values())
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        # cached properties are in the instance dict, next to the fields
+        value = list(vars(value).values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(item, seen) for item in value)
+    return 0
+
+
+class SheetCache:
+    """Downloaded sheets cache, an in-memory tier in front of parquet files.
+
+    Entries are keyed by sheet id and are considered fresh for ``ttl`` seconds
+    after the download, a hit skips both the network and the CSV parsing.
+
+    A single instance is shared by all the sessions of the process: the memory
+    tier is a LRU bounded by ``max_bytes`` and concurrent fetches of the same
+    key are deduplicated, the first caller downloads and the others wait for
+    its result. A cached dataset grows with the memos and index built on it,
+    the entries are measured again whenever one is added.
+
+    ``on_evict(key, value)`` is called for every entry evicted from memory,
+    the holders of the value can let it go too.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        on_evict: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.path = Path(path) if path is not None else get_cache_dir_path()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0  # fetches served by a concurrent one
+        self._memory: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _file(self, key: str) -> Path:
+        file = self.path / f"{key}.parquet"
+        # keys are made of user input (URLs, owners), never a file elsewhere
+        if not file.resolve().is_relative_to(self.path.resolve()):
+            raise ValueError(f"cache key out of the cache directory: {key!r}")
+        return file
+
+    def _is_fresh(self, fetched_at: float, ttl: float) -> bool:
+        return time.time() - fetched_at <= ttl
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _remember(self, key: str, fetched_at: float, value: Any):
+        with self._lock:
+            others = [(k, v) for k, (_, v, _) in self._memory.items() if k != key]
+        # measured out of the lock, the first deep size of a frame takes a
+        # scan of its strings
+        sizes = {k: (v, nbytes(v)) for k, v in others}
+        size = nbytes(value)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.pop(key)
+            self._memory[key] = (fetched_at, value, size)
+            for k, (v, grown) in sizes.items():
+                entry = self._memory.get(k)
+                if entry is not None and entry[1] is v:
+                    self._memory[k] = (entry[0], v, grown)
+            self._bytes = sum(entry[2] for entry in self._memory.values())
+
+            # the newest entry is kept even when larger than the whole budget
+            evicted = []
+            while self._bytes > self.max_bytes and len(self._memory) > 1:
+                old_key, (_, old_value, old_size) = self._memory.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+
+        if self.on_evict is not None:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[DataFrame]:
+        """Return the cached sheet, None if missing or older than ttl"""
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            if key in self._memory:
+                fetched_at, df, _ = self._memory[key]
+                if self._is_fresh(fetched_at, ttl):
+                    self._memory.move_to_end(key)
+                    return df
+
+        file = self._file(key)
+        if file.exists():
+            fetched_at = file.stat().st_mtime
+            if self._is_fresh(fetched_at, ttl):
+                import pandas as pd
+
+                df = pd.read_parquet(file)
+                self._remember(key, fetched_at, df)
+                return df
+
+        return None
+
+    def put(self, key: str, df: Any, persist: bool = True):
+        self._remember(key, time.time(), df)
+        if not persist:
+            return
+
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # write aside and rename, a crash never leaves a truncated file
+            tmp = self._file(f".{key}.tmp")
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self._file(key))
+        except Exception:
+            # the disk tier is best effort, the memory tier is still valid
+            pass
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._bytes -= self._memory.pop(key)[2]
+        self._file(key).unlink(missing_ok=True)
+
+    def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Any],
+        ttl: Optional[float] = None,
+        refresh: bool = False,
+        persist: bool = True,
+    ) -> Any:
+        df = None if refresh else self.get(key, ttl)
+        if df is not None:
+            self._count("hits")
+            return df
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+
+        if not leader:
+            # same key requested by another session, share its download
+            self._count("coalesced")
+            self._count("hits")
+            return flight.result()
+
+        try:
+            # a concurrent fetch may have completed since the first check
+            df = None if refresh else self.get(key, ttl)
+            if df is not None:
+                self._count("hits")
+            else:
+                self._count("misses")
+                df = fetch()
+                self.put(key, df, persist)
+            flight.set_result(df)
+            return df
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def fetched_at(self, key: str) -> Optional[float]:
+        """Time of the download of the cached entry, a version of its content"""
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key][0]
+        file = self._file(key)
+        if file.exists():
+            return file.stat().st_mtime
+        return None
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the cached sheet was downloaded"""
+        fetched_at = self.fetched_at(key)
+        return None if fetched_at is None else time.time() - fetched_at
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the memory tier"""
+        return self._bytes
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class Memo:
+    """Thread-safe LRU memo of computed values, bounded by entry count"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+
+        # computed outside the lock, two sessions may compute the same value
+        value = compute()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -0,0 +1,421 @@
+"""Data layer of the dashboard, pandas only and no streamlit.
+
+pandas and numpy are imported inside the functions: importing the module does
+not load them, the URL box shows up before they are needed.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+from cache import Memo
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pandas import DataFrame, Series
+
+
+def shareable(df: DataFrame) -> DataFrame:
+    """``df`` with the lookup table of its index built.
+
+    pandas builds it on the first lookup by label (reindex, alignment) and the
+    build is not thread-safe: threads racing on it see a half-filled table, a
+    unique index taken for a duplicated one. Frames read by the threads of
+    several sessions are prepared before they are published.
+    """
+    df.index.is_unique
+    return df
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Normalized transactions and the structures precomputed on them, shared
+    by the sessions"""
+
+    transactions: DataFrame
+    cube: DataFrame
+    tags: DataFrame
+
+    def __post_init__(self):
+        for df in (self.transactions, self.cube, self.tags):
+            shareable(df)
+
+    @classmethod
+    def from_transactions(cls, df: DataFrame, compact: bool = False) -> Dataset:
+        tags = build_tag_table(df)
+        if compact:
+            df = compact_transactions(df)
+        return cls(transactions=df, cube=build_cube(df), tags=tags)
+
+    def side(self, expense: bool) -> Tuple[DataFrame, DataFrame]:
+        """Expenses (or incomes) and their tags, split once per dataset"""
+        return self._sides[expense]
+
+    @cached_property
+    def memo(self) -> Memo:
+        """Results computed on this version of the data, e.g. the filtered trends"""
+        return Memo()
+
+    @cached_property
+    def search(self) -> SearchIndex:
+        """Index of the words of the descriptions and of the tags, built on the
+        first search and shared by the sessions of this version of the data"""
+        return SearchIndex(self.transactions, self.tags)
+
+    @cached_property
+    def _sides(self) -> Dict[bool, Tuple[DataFrame, DataFrame]]:
+        df = self.transactions
+        sides = {}
+        for expense in (True, False):
+            part = df[df.expense == expense]
+            sides[expense] = (shareable(part), shareable(tags_of(self.tags, part)))
+        return sides
+
+    @property
+    def owners(self) -> List[str]:
+        """Owners of a household dataset, empty for a single sheet"""
+        if "owner" not in self.transactions:
+            return []
+        return list(self.transactions["owner"].unique())
+
+    def with_owners(self, owners: Sequence[str]) -> Dataset:
+        """Transactions, cube and tags of the given owners only"""
+
+        def select() -> Dataset:
+            df = self.transactions[self.transactions["owner"].isin(owners)]
+            return Dataset(
+                transactions=df,
+                cube=self.cube[self.cube["owner"].isin(owners)],
+                tags=tags_of(self.tags, df),
+            )
+
+        # memoized, the subset keeps its own memo between the reruns
+        return self.memo.get_or_compute(("owners", frozenset(owners)), select)
+
+
+def build_cube(df: DataFrame) -> DataFrame:
+    """Sum and count of the amounts by (year, month, expense, category, account),
+    and owner for a household"""
+    keys = ["year", "month", "expense", "category", "account"]
+    if "owner" in df:
+        keys.append("owner")
+    return (
+        df.groupby(keys, dropna=False, observed=True)
+        .amount.agg(amount="sum", count="size")
+        .reset_index()
+    )
+
+
+def build_tag_table(df: DataFrame) -> DataFrame:
+    """Long form (row, tag) table, one entry for each tag of each transaction.
+
+    ``row`` is the label of the transaction, tags are categorical so the names
+    are stored once and compared as integer codes.
+    """
+    import pandas as pd
+
+    tags = df["tags"].explode().dropna()
+    return pd.DataFrame(
+        {"row": tags.index, "tag": pd.Categorical(tags.to_numpy())},
+    )
+
+
+def tags_of(tag_table: DataFrame, df: DataFrame) -> DataFrame:
+    """Entries of the tag table of the transactions in ``df``"""
+    return tag_table[tag_table.row.isin(df.index)]
+
+
+def tag_lists(tag_table: DataFrame, df: DataFrame) -> Series:
+    """Tags of each transaction of ``df`` as lists, decoded from the tag table"""
+    import numpy as np
+    import pandas as pd
+
+    tag_table = tags_of(tag_table, df)
+    lists = tag_table.tag.astype(str).groupby(tag_table.row.to_numpy()).agg(list)
+    lists = lists.reindex(df.index).to_numpy()
+    for idx in np.flatnonzero(pd.isna(lists)):
+        lists[idx] = []
+    return pd.Series(lists, index=df.index, name="tags")
+
+
+def compact_transactions(df: DataFrame) -> DataFrame:
+    """Smaller in-memory representation of the normalized transactions.
+
+    Category and account become categorical, descriptions Arrow-backed strings
+    and the period keys small integers. The tags lists are dropped, the tag
+    table already holds them as codes into a shared dictionary. Amounts stay
+    ``float64``, the sums of a long history exceed what ``float32`` represents
+    to the cent.
+    """
+    import pandas as pd
+
+    description = df["description"]
+    # the missing descriptions are empty lists, see load_data
+    description = description.where(description.map(type) == str)
+
+    if "owner" in df:
+        df = df.assign(owner=df["owner"].astype("category"))
+
+    return df.drop(columns="tags").assign(
+        category=df["category"].astype("category"),
+        account=df["account"].astype("category"),
+        description=description.astype("string[pyarrow]"),
+        year=pd.to_numeric(df["year"], downcast="integer"),
+        month=pd.to_numeric(df["month"], downcast="integer"),
+    )
+
+
+def memory_report(df: DataFrame, compact: DataFrame, tag_table: DataFrame) -> DataFrame:
+    """Deep memory usage of each column, in bytes, of the two representations"""
+    before = df.memory_usage(index=False, deep=True)
+    after = compact.memory_usage(index=False, deep=True)
+    after["tags"] = tag_table.memory_usage(index=False, deep=True).sum()
+
+    import pandas as pd
+
+    report = pd.DataFrame({"before": before, "after": after.reindex(before.index)})
+    report.loc["total"] = report.sum()
+    report["ratio"] = report["after"] / report["before"]
+    return report.rename_axis("column").reset_index()
+
+
+_WORD_RE = re.compile(r"\w+")
+# hyphenated words are indexed whole too, terms and tags keep their hyphens
+# like the tags of engine._TAG_PATTERN
+_COMPOUND_RE = re.compile(r"\w+(?:-\w+)+")
+_TERM_RE = re.compile(r"#?[\w-]+")
+
+
+def _words(text: str) -> Set[str]:
+    text = text.lower()
+    return set(_WORD_RE.findall(text)).union(_COMPOUND_RE.findall(text))
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """``values`` grouped by ``keys`` in [0, n): the values of key ``k`` are
+    ``values[indptr[k]:indptr[k + 1]]``"""
+    import numpy as np
+
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order]
+
+
+class SearchIndex:
+    """Inverted index of the words of the descriptions and of the tags.
+
+    The distinct descriptions are tokenized once, the vocabulary is sorted so
+    the words starting with a prefix are a range found by binary search. A
+    query matches the transactions having, for every term, a word or a tag
+    starting with it, ``#term`` matches the tags only.
+    """
+
+    def __init__(self, df: DataFrame, tag_table: DataFrame):
+        import numpy as np
+        import pandas as pd
+
+        self.labels = df.index.to_numpy()
+
+        # missing descriptions are empty lists (or NA when compact)
+        description = df["description"]
+        if description.dtype == object:
+            description = description.where(description.map(type) == str)
+        codes, descriptions = pd.factorize(description)
+        # -1, a missing description, picks a trailing slot that never matches
+        self._codes = np.where(codes < 0, len(descriptions), codes)
+
+        pairs = [
+            (word, code)
+            for code, text in enumerate(descriptions)
+            for word in _words(text)
+        ]
+        words = np.array([word for word, _ in pairs], dtype=str)
+        self._words = np.unique(words)
+        self._word_descriptions = _csr(
+            np.searchsorted(self._words, words),
+            np.array([code for _, code in pairs], dtype=np.int64),
+            len(self._words),
+        )
+        self._descriptions = len(descriptions)
+
+        tag_table = tags_of(tag_table, df)
+        tags = tag_table.tag.cat.categories.str.lower().to_numpy(dtype=str)
+        order = np.argsort(tags, kind="stable")
+        self._tags = tags[order]
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        self._tag_rows = _csr(
+            ranks[tag_table.tag.cat.codes.to_numpy()],
+            df.index.get_indexer(tag_table.row),
+            len(self._tags),
+        )
+
+    @staticmethod
+    def _prefix_range(vocabulary: np.ndarray, prefix: str) -> Tuple[int, int]:
+        import numpy as np
+
+        lo = np.searchsorted(vocabulary, prefix, side="left")
+        hi = np.searchsorted(vocabulary, prefix + "\U0010ffff", side="left")
+        return int(lo), int(hi)
+
+    def _term_mask(self, term: str) -> np.ndarray:
+        import numpy as np
+
+        mask = np.zeros(len(self.labels), dtype=bool)
+        tags_only = term.startswith("#")
+        term = term.lstrip("#")
+
+        if not tags_only:
+            indptr, codes = self._word_descriptions
+            lo, hi = self._prefix_range(self._words, term)
+            matching = np.zeros(self._descriptions + 1, dtype=bool)
+            matching[codes[indptr[lo] : indptr[hi]]] = True
+            mask |= matching[self._codes]
+
+        indptr, rows = self._tag_rows
+        lo, hi = self._prefix_range(self._tags, term)
+        mask[rows[indptr[lo] : indptr[hi]]] = True
+        return mask
+
+    def mask(self, query: str) -> Optional[np.ndarray]:
+        """Positions of the matching transactions as a mask, None for an empty query"""
+        terms = _TERM_RE.findall(query.lower())
+        if not terms:
+            return None
+        mask = self._term_mask(terms[0])
+        for term in terms[1:]:
+            mask &= self._term_mask(term)
+        return mask
+
+    def rows(self, query: str) -> np.ndarray:
+        """Labels of the transactions matching every term of the query, all of
+        them for an empty query"""
+        mask = self.mask(query)
+        return self.labels if mask is None else self.labels[mask]
+
+
+def top_k_positions(values: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` largest values, descending, ties by position.
+
+    ``argpartition`` finds the k-th largest value in linear time, only the rows
+    above it are sorted.
+    """
+    import numpy as np
+
+    # missing amounts rank last, like in sort_values
+    values = np.where(np.isnan(values), -np.inf, values)
+    n = len(values)
+    if k >= n:
+        return np.lexsort((np.arange(n), -values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    threshold = values[np.argpartition(-values, k - 1)[k - 1]]
+    greater = np.flatnonzero(values > threshold)
+    equal = np.flatnonzero(values == threshold)[: k - len(greater)]
+    positions = np.concatenate([greater, equal])
+    return positions[np.lexsort((positions, -values[positions]))]
+
+
+def page_by_amount(df: DataFrame, page: int, page_size: int) -> DataFrame:
+    """Rows of the ``page`` (from 0) of ``df`` sorted by decreasing amount"""
+    stop = (page + 1) * page_size
+    positions = top_k_positions(df["amount"].to_numpy(), stop)
+    return df.iloc[positions[page * page_size : stop]]
+
+
+def select_period(
+    cube: DataFrame,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    same_month: bool = True,
+    same_year: bool = True,
+) -> DataFrame:
+    """Cube rows of the period, same semantic of ``select_month_year``"""
+    if month:
+        cube = cube[(cube.month == month) == same_month]
+
+    if year:
+        cube = cube[(cube.year == year) == same_year]
+
+    return cube
+
+
+def _intersect(
+    first: List[Tuple[int, int]], second: List[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """Intersection of two sorted lists of disjoint [start, stop) intervals"""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        start = max(first[i][0], second[j][0])
+        stop = min(first[i][1], second[j][1])
+        if start < stop:
+            result.append((start, stop))
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _complement(intervals: List[Tuple[int, int]], n: int) -> List[Tuple[int, int]]:
+    result = []
+    start = 0
+    for lo, hi in intervals:
+        result.append((start, lo))
+        start = hi
+    result.append((start, n))
+    return [(lo, hi) for lo, hi in result if lo < hi]
+
+
+def period_slices(
+    df: DataFrame,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    same_month: bool = True,
+    same_year: bool = True,
+) -> List[slice]:
+    """Positional slices of the rows of the period, ``df`` must be sorted by date.
+
+    The bounds of each (year, month) are found with a binary search on the date
+    column, negated selections are the complement slices of the positive ones.
+    """
+    import numpy as np
+
+    dates = df["date"].to_numpy()
+    n = len(dates)
+    if n == 0:
+        return []
+
+    def offset(y: int, m: int) -> int:
+        # the keys may be small numpy integers of a compact frame
+        y, m = int(y) + (int(m) - 1) // 12, (int(m) - 1) % 12 + 1
+        return int(dates.searchsorted(np.datetime64(f"{y:04d}-{m:02d}-01")))
+
+    intervals = [(0, n)]
+
+    if month:
+        # the month repeats in every year covered by the data, NaT rows sort last
+        last = int(dates.searchsorted(np.datetime64("NaT"))) - 1
+        months = []
+        if last >= 0:
+            years = dates[[0, last]].astype("datetime64[Y]").astype(int) + 1970
+            months = [
+                (offset(y, month), offset(y, month + 1))
+                for y in range(years[0], years[1] + 1)
+            ]
+        if not same_month:
+            months = _complement(months, n)
+        intervals = _intersect(intervals, months)
+
+    if year:
+        years = [(offset(year, 1), offset(year + 1, 1))]
+        if not same_year:
+            years = _complement(years, n)
+        intervals = _intersect(intervals, years)
+
+    return [slice(lo, hi) for lo, hi in intervals if lo < hi]
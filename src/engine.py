@@ -0,0 +1,571 @@
+"""Analytics of the dashboard, without streamlit.
+
+Normalization of the sheet, period selections, totals, trends and tags, and
+the month and year reports built on them. The dashboard renders these frames,
+``report.py`` writes them to static files.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import (TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple,
+                    Union)
+
+from dataset import (Dataset, build_tag_table, page_by_amount, period_slices,
+                     select_period, tags_of)
+from utils import _r, delta, get_prev_month_year
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pandas import DataFrame, Series
+
+_TAG_PATTERN = r"#([a-zA-Z0-9_-]+)"
+
+# what the month is compared to
+COMPARISONS = ("month", "monthavg", "year")
+ROLLING_WINDOWS = (3, 6, 12)  # months
+
+# formats tried by detect_date_format, day first as the dates of the sheet
+_DATE_FORMATS = (
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%d-%m-%Y",
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+)
+
+
+def detect_date_format(values: np.ndarray, sample: int = 100) -> Optional[str]:
+    """Known format that parses most of the sampled values, None if no format
+    parses at least half of them"""
+    import pandas as pd
+
+    values = values[:sample]
+    best, best_count = None, len(values) / 2
+    for date_format in _DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=date_format, errors="coerce")
+        count = parsed.notna().sum()
+        # a few values edited by hand are left to the fallback
+        if count >= 0.9 * len(values):
+            return date_format
+        if count >= best_count:
+            best, best_count = date_format, count
+    return best
+
+
+def parse_dates(dates: Series) -> Series:
+    """Dates of the sheet, parsed with the format of the sheet.
+
+    A sheet has a few thousand distinct dates over hundreds of thousands of
+    rows, only the distinct strings are parsed and the result is broadcast to
+    the rows. The values the detected format does not fit (e.g. edited by hand)
+    are parsed one by one, day first.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if dates.dtype != object:
+        return pd.to_datetime(dates, dayfirst=True)
+
+    # missing dates have code -1
+    codes, uniques = pd.factorize(dates)
+    uniques = np.asarray(uniques, dtype=object)
+
+    date_format = detect_date_format(uniques)
+    if date_format is None:
+        # the format is inferred from the first value
+        parsed = pd.to_datetime(uniques, dayfirst=True, errors="coerce")
+    else:
+        parsed = pd.to_datetime(uniques, format=date_format, errors="coerce")
+    parsed = parsed.to_numpy(dtype="datetime64[ns]")
+
+    failed = np.isnat(parsed)
+    if failed.any():
+        # raises on values that are not dates
+        parsed[failed] = pd.to_datetime(
+            uniques[failed], format="mixed", dayfirst=True
+        ).to_numpy(dtype="datetime64[ns]")
+
+    # the code -1 picks the trailing NaT
+    parsed = np.append(parsed, np.datetime64("NaT", "ns"))
+    return pd.Series(parsed[codes], index=dates.index, name=dates.name)
+
+
+def parse_amounts(values: Series) -> Series:
+    import pandas as pd
+
+    # replace possible commas in the numbers, so can be correcly casted to numerical
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if values.dtype == object and kind in ("string", "mixed", "mixed-integer"):
+        values = values.str.replace(",", ".", regex=False).fillna(values)
+    return pd.to_numeric(values)
+
+
+def read_fx_rates(path: Union[str, Path]) -> DataFrame:
+    """Dated FX rates, a CSV with ``date``, ``currency`` and ``rate`` columns.
+
+    ``rate`` is the value in the main currency of one unit of the currency,
+    from its date until the next rate of the currency.
+    """
+    import pandas as pd
+
+    rates = pd.read_csv(path, dtype=str).rename(columns=str.lower)
+    missing = {"date", "currency", "rate"} - set(rates.columns)
+    if missing:
+        raise ValueError(f"missing columns {', '.join(sorted(missing))}")
+    rates = pd.DataFrame(
+        {
+            "date": parse_dates(rates["date"]),
+            "currency": rates["currency"].str.strip(),
+            "rate": parse_amounts(rates["rate"]),
+        }
+    )
+    return rates.dropna().sort_values("date", kind="stable", ignore_index=True)
+
+
+def convert_currency(
+    amount: Series, dates: Series, currencies: Series, rates: DataFrame
+) -> Series:
+    """Amounts in the main currency, at the last rate of their currency on or
+    before their date.
+
+    The rows are sorted by date and joined to the rates with a single as-of
+    merge by currency, the currencies compared as integer codes. Dates before
+    the first rate of a currency take that rate, amounts without a date or in a
+    currency without rates (the main one) are kept as they are.
+    """
+    import numpy as np
+    import pandas as pd
+
+    known = pd.Index(rates["currency"].unique())
+    # the first rate of every currency also applies before its date
+    first = rates.groupby("currency", sort=False).head(1).assign(date=pd.Timestamp.min)
+    table = pd.concat([first, rates]).sort_values("date", kind="stable")
+    table = pd.DataFrame(
+        {
+            "date": table["date"].to_numpy(),
+            "code": known.get_indexer(table["currency"]),
+            "rate": table["rate"].to_numpy(),
+        }
+    )
+
+    # missing dates sort last and are left out of the merge
+    dates = dates.to_numpy()
+    order = np.argsort(dates, kind="stable")
+    valid = order[: int((~np.isnat(dates)).sum())]
+    rows = pd.DataFrame(
+        {
+            "date": dates[valid],
+            "code": known.get_indexer(currencies.to_numpy()[valid]),
+        }
+    )
+    rate = np.ones(len(dates))
+    merged = pd.merge_asof(rows, table, on="date", by="code")["rate"].to_numpy()
+    rate[valid] = np.where(np.isnan(merged), 1.0, merged)
+
+    return amount * rate
+
+
+def main_currency_amounts(df: DataFrame, rates: Optional[DataFrame] = None) -> Series:
+    """Signed amounts of the normalized sheet in the main currency.
+
+    The ``in main currency`` column of the sheet where it is filled, otherwise
+    the amount converted with ``rates`` when the sheet has a ``currency``
+    column, otherwise the amount as it is.
+    """
+    import pandas as pd
+
+    if "in main currency" not in df:
+        amount = parse_amounts(df["amount"])
+        if rates is not None and "currency" in df:
+            amount = convert_currency(amount, df["date"], df["currency"], rates)
+        return amount
+
+    main = parse_amounts(df["in main currency"])
+    todo = main.isna().to_numpy()
+    if not todo.any():
+        return main
+
+    # the other column is parsed, and converted, only for the missing rows
+    rows = df[todo]
+    amount = main_currency_amounts(rows.drop(columns="in main currency"), rates)
+    values = main.to_numpy(dtype=float, copy=True)
+    values[todo] = amount.to_numpy()
+    return pd.Series(values, index=main.index, name=main.name)
+
+
+def load_data(df: DataFrame, rates: Optional[DataFrame] = None) -> DataFrame:
+    """Normalized transactions of the sheet, sorted by date, amounts in the main
+    currency (see ``main_currency_amounts``)"""
+    import numpy as np
+    import pandas as pd
+
+    # remove transfer entries, are not relevant for the analysis
+    columns = ["Date", "Category", "Amount", "Account", "Description"]
+    # sheets of a household are tagged with their owner
+    if "Owner" in df:
+        columns.append("Owner")
+    currency = [column for column in ("In main currency", "Currency") if column in df]
+    df = df.loc[df["Category"] != "Transfer", columns + currency]
+
+    # lower all the columns' names
+    df = df.rename(columns=str.lower)
+
+    df["date"] = parse_dates(df["date"])
+    amount = main_currency_amounts(df, rates)
+    df = df.drop(columns=[column.lower() for column in currency])
+
+    # flag usefull for code readability
+    df["expense"] = amount < 0
+
+    df["amount"] = np.abs(amount)
+
+    # tags are searched once per distinct description, then broadcast to the rows
+    codes, descriptions = pd.factorize(df["description"], use_na_sentinel=False)
+    descriptions = pd.Series(descriptions, dtype=object)
+
+    # find tags
+    tags = descriptions.str.findall(_TAG_PATTERN).to_numpy()
+
+    # remove tags from description
+    descriptions = descriptions.str.replace(_TAG_PATTERN, "", regex=True).to_numpy()
+
+    # rows without description have no tags, and an empty list as description
+    for idx in np.flatnonzero(pd.isna(descriptions)):
+        tags[idx] = []
+        descriptions[idx] = []
+
+    df["tags"] = tags[codes]
+    df["description"] = descriptions[codes]
+
+    # integer keys of the period, rows sorted by date make every period a range
+    df["year"] = df["date"].dt.year
+    df["month"] = df["date"].dt.month
+    df = df.sort_values(by="date", kind="stable")
+
+    return df
+
+
+def load_dataset(
+    df: DataFrame, compact: bool = False, rates: Optional[DataFrame] = None
+) -> Dataset:
+    """Normalize the sheet and precompute the aggregates used by the overviews"""
+    return Dataset.from_transactions(load_data(df, rates), compact=compact)
+
+
+def get_trend(
+    df: DataFrame, temporal_period: Sequence[int], categories: Series
+) -> DataFrame:
+    df = (
+        df.groupby(by=[temporal_period, categories], observed=True)
+        .amount.sum()
+        .reset_index(name="amount")
+    )
+    return df
+
+
+def category_totals(trend: DataFrame) -> DataFrame:
+    """Total of each category of the trend, ascending"""
+    return (
+        trend.groupby("category", observed=True)
+        .amount.sum()
+        .reset_index(name="amount")
+        .sort_values(by=["amount", "category"], ignore_index=True)
+    )
+
+
+def select_month_year(
+    df: DataFrame,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    same_month: bool = True,
+    same_year: bool = True,
+) -> DataFrame:
+    import pandas as pd
+
+    slices = period_slices(df, month, year, same_month, same_year)
+
+    # a single range is a plain slice, only scattered selections are copied
+    if len(slices) == 1:
+        return df.iloc[slices[0]]
+    if not slices:
+        return df.iloc[:0]
+    return pd.concat([df.iloc[s] for s in slices])
+
+
+def inc_exp_sum(
+    cube: DataFrame,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    same_month: bool = True,
+    same_year: bool = True,
+) -> Tuple[float, float]:
+    cube = select_period(cube, month, year, same_month, same_year)
+    totals = cube.groupby("expense").amount.sum()
+    return _r(totals.get(False, 0.0)), _r(totals.get(True, 0.0))
+
+
+def inc_exp_monthly_avg(
+    cube: DataFrame, month: int, year: int
+) -> Tuple[float, float]:
+    """Average of the monthly totals of the year, the given month excluded"""
+    cube = select_period(cube, month, year, same_month=False)
+    averages = cube.groupby(["expense", "month"]).amount.sum().groupby("expense").mean()
+    return _r(averages.get(False, 0.0)), _r(averages.get(True, 0.0))
+
+
+def trend_frames(
+    df: DataFrame,
+    tag_table: DataFrame,
+    genre: str,
+    option: int,
+    dont_consider_categories: Sequence[str] = (),
+    dont_consider_accounts: Sequence[str] = (),
+    dont_consider_owners: Optional[Sequence[str]] = None,
+    ignored_tags: Sequence[str] = (),
+    split: bool = False,
+) -> Tuple[DataFrame, DataFrame]:
+    """Trend of the filtered transactions and the total of each category"""
+    time_period_condition = df.year if genre == "Year" else df.month
+
+    condition = (
+        (time_period_condition == option)
+        & ~df.account.isin(list(dont_consider_accounts))
+        & ~df.category.isin(list(dont_consider_categories))
+    )
+    if dont_consider_owners is not None:
+        condition &= ~df.owner.isin(list(dont_consider_owners))
+    df_tmp = df[condition]
+
+    # remove tags
+    if ignored_tags:
+        ignored_rows = tag_table.row[tag_table.tag.isin(list(ignored_tags))]
+        df_tmp = df_tmp[~df_tmp.index.isin(ignored_rows)]
+
+    temporal_period = (df_tmp.year if genre == "Month" else df_tmp.month).rename("date")
+
+    # columns of the filtered rows, no alignment on the index of ``df``
+    categories = df_tmp.category
+    if split:
+        categories = (
+            df_tmp.category.astype(str) + " · " + df_tmp.owner.astype(str)
+        ).rename("category")
+
+    trend = get_trend(df=df_tmp, temporal_period=temporal_period, categories=categories)
+    return trend, category_totals(trend)
+
+
+def compare_month(
+    cube: DataFrame, month: int, year: int, compare: str = "month"
+) -> Tuple[float, float]:
+    """Incomes and expenses the month is compared to: the previous month, the
+    average of the other months of the year or the same month of the previous year"""
+    prev_month, prev_year = get_prev_month_year(month, year)
+
+    if compare == "month":
+        prev_year = prev_year if month == 1 else year
+        return inc_exp_sum(cube, prev_month, prev_year)
+    if compare == "year":
+        return inc_exp_sum(cube, month, prev_year)
+    if compare == "monthavg":
+        return inc_exp_monthly_avg(cube, month, year)
+    raise ValueError(f"unknown comparison {compare!r}, expected one of {COMPARISONS}")
+
+
+def year_totals(
+    cube: DataFrame, year: int, exclude_month: Optional[int] = None
+) -> Tuple[float, float]:
+    """Incomes and expenses of the year, ``exclude_month`` left out"""
+    if exclude_month:
+        return inc_exp_sum(cube, exclude_month, year, same_month=False)
+    return inc_exp_sum(cube, year=year)
+
+
+def year_trend(cube: DataFrame, year: int) -> DataFrame:
+    """Monthly totals of incomes and expenses of the year, ``date`` is the month"""
+    import numpy as np
+
+    df = (
+        select_period(cube, year=year)
+        .groupby(by=["month", "expense"])
+        .amount.sum()
+        .reset_index(name="amount")
+        .rename(columns={"month": "date"})
+    )
+    df["expense"] = np.where(df["expense"], "expense", "income")
+    return df
+
+
+def _month_starts(cube: DataFrame) -> Series:
+    import pandas as pd
+
+    keys = pd.DataFrame({"year": cube["year"], "month": cube["month"], "day": 1})
+    return pd.to_datetime(keys).rename("date")
+
+
+def monthly_totals(cube: DataFrame) -> DataFrame:
+    """Incomes, expenses and the whole-history analytics of every month.
+
+    One row per month from the first to the last of the history, months without
+    transactions count as zeros. ``balance`` is the cumulative net, the rolling
+    means of incomes and expenses are over ``ROLLING_WINDOWS`` months and
+    ``savings_rate`` is the share (%) of the incomes not spent, NaN without
+    incomes. The cube is grouped once, everything else is computed on the
+    monthly series.
+    """
+    import pandas as pd
+
+    cube = cube.dropna(subset=["year", "month"])
+    totals = (
+        cube.groupby([_month_starts(cube), cube["expense"]])
+        .amount.sum()
+        .unstack("expense")
+        .reindex(columns=[False, True])
+        .fillna(0.0)
+        .set_axis(["incomes", "expenses"], axis=1)
+    )
+    if not totals.empty:
+        months = pd.date_range(totals.index.min(), totals.index.max(), freq="MS", name="date")
+        totals = totals.reindex(months, fill_value=0.0)
+
+    totals["net"] = totals["incomes"] - totals["expenses"]
+    totals["balance"] = totals["net"].cumsum()
+    for window in ROLLING_WINDOWS:
+        means = totals[["incomes", "expenses"]].rolling(window, min_periods=1).mean()
+        totals[f"incomes_{window}m"] = means["incomes"]
+        totals[f"expenses_{window}m"] = means["expenses"]
+    incomes = totals["incomes"].where(totals["incomes"] > 0)
+    totals["savings_rate"] = totals["net"] / incomes * 100
+
+    return totals.reset_index()
+
+
+def category_shares(cube: DataFrame, expense: bool = True) -> DataFrame:
+    """Amount of each category in every month and its share (%) of the month"""
+    cube = cube[cube["expense"] == expense].dropna(subset=["year", "month"])
+    amounts = (
+        cube.groupby([_month_starts(cube), cube["category"]], observed=True)
+        .amount.sum()
+        .unstack("category", fill_value=0.0)
+    )
+    shares = amounts.div(amounts.sum(axis=1), axis=0) * 100
+
+    return (
+        amounts.stack()
+        .rename("amount")
+        .to_frame()
+        .assign(share=shares.stack())
+        .reset_index()
+    )
+
+
+def overall_frames(cube: DataFrame) -> Tuple[DataFrame, Dict[str, DataFrame]]:
+    """Monthly totals and the category shares of incomes and expenses"""
+    shares = {
+        "expenses": category_shares(cube, expense=True),
+        "incomes": category_shares(cube, expense=False),
+    }
+    return monthly_totals(cube), shares
+
+
+def tag_totals(df: DataFrame, tag_table: Optional[DataFrame] = None) -> DataFrame:
+    """Sum of the amounts of each tag and its share (%) of the total of ``df``"""
+    import pandas as pd
+
+    if tag_table is None:
+        tag_table = build_tag_table(df)
+    tag_table = tags_of(tag_table, df)
+
+    # a lookup by label in the index of ``df``: the frames of a Dataset are
+    # shared with their index prepared (dataset.shareable), the others are
+    # slices made by this rerun
+    values = (
+        pd.DataFrame(
+            {
+                "tag": tag_table.tag.to_numpy(),
+                "value": df.amount.reindex(tag_table.row).to_numpy(),
+            }
+        )
+        .groupby("tag", observed=True)
+        .value.sum()
+    )
+
+    df_summary = pd.DataFrame(
+        {"tag": values.index.astype(str), "value": values.to_numpy()},
+        index=values.index,
+    )
+    if not df_summary.empty:
+        df_summary["impact"] = (df_summary.value / df["amount"].sum()) * 100
+    return df_summary
+
+
+def top_five(df: DataFrame) -> DataFrame:
+    """The five largest transactions of ``df``"""
+    return page_by_amount(df[["date", "category", "amount", "description"]], 0, 5)
+
+
+def periods(data: Dataset) -> List[Tuple[int, int]]:
+    """(year, month) of the months with at least a transaction, sorted"""
+    keys = data.cube[["year", "month"]].drop_duplicates().sort_values(["year", "month"])
+    return [(int(y), int(m)) for y, m in keys.itertuples(index=False)]
+
+
+def records(df: DataFrame) -> List[Dict[str, Any]]:
+    """Rows of ``df`` as JSON serializable dicts, dates as ISO strings"""
+    import json
+
+    return json.loads(df.to_json(orient="records", date_format="iso", date_unit="s"))
+
+
+def _sides_report(data: Dataset, month: Optional[int], year: int) -> Dict[str, Any]:
+    report = {}
+    for title, expense in (("incomes", False), ("expenses", True)):
+        df, tag_table = data.side(expense)
+        df = select_month_year(df, month, year)
+        report[title] = dict(
+            top=records(top_five(df)),
+            categories=records(category_totals(df)),
+            tags=records(tag_totals(df, tag_table)),
+        )
+    return report
+
+
+def month_report(data: Dataset, year: int, month: int) -> Dict[str, Any]:
+    """Totals of the month, their deltas to every comparison, top transactions,
+    categories and tags"""
+    incomes, expenses = inc_exp_sum(data.cube, month, year)
+
+    deltas = {}
+    for compare in COMPARISONS:
+        prev_incomes, prev_expenses = compare_month(data.cube, month, year, compare)
+        deltas[compare] = dict(
+            incomes=delta(incomes, prev_incomes), expenses=delta(expenses, prev_expenses)
+        )
+
+    return dict(
+        year=int(year),
+        month=int(month),
+        totals=dict(incomes=float(incomes), expenses=float(expenses)),
+        deltas=deltas,
+        **_sides_report(data, month, year),
+    )
+
+
+def year_report(data: Dataset, year: int) -> Dict[str, Any]:
+    """Totals of the year, their deltas to the previous year, monthly trend,
+    top transactions, categories and tags"""
+    incomes, expenses = year_totals(data.cube, year)
+    prev_incomes, prev_expenses = year_totals(data.cube, year - 1)
+
+    return dict(
+        year=int(year),
+        totals=dict(incomes=float(incomes), expenses=float(expenses)),
+        deltas=dict(
+            year=dict(
+                incomes=delta(incomes, prev_incomes),
+                expenses=delta(expenses, prev_expenses),
+            )
+        ),
+        trend=records(year_trend(data.cube, year)),
+        **_sides_report(data, None, year),
+    )
@@ -0,0 +1,208 @@
+"""HTTP client of the gviz CSV endpoint.
+
+A single pooled client per process keeps the connections to the endpoint
+alive between the downloads, asks for a gzip body, bounds the connect and
+read times and retries 429 and 5xx answers (and connection errors) with a
+bounded exponential backoff, honoring ``Retry-After`` up to the same bound.
+
+The body is decompressed while it is parsed, the CSV text is never held in
+memory as a whole:
+
+    with open_csv(url) as body:
+        df = pd.read_csv(body)
+
+Every download is recorded, bytes on the wire and decompressed, time to the
+response headers and in total, and the number of retries.
+"""
+from __future__ import annotations
+
+import io
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Deque, Iterator, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from urllib3 import BaseHTTPResponse, PoolManager
+
+CONNECT_TIMEOUT = 5.0  # seconds
+READ_TIMEOUT = 30.0  # seconds, between two reads of the socket
+RETRIES = 4
+BACKOFF = 0.5  # seconds, doubled at every retry
+BACKOFF_MAX = 10.0  # seconds
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class FetchError(Exception):
+    """Download failed, ``status`` is None when no answer was received"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class Download(NamedTuple):
+    url: str
+    status: Optional[int]
+    wire_bytes: int  # as received, compressed
+    bytes: int  # decompressed
+    encoding: Optional[str]
+    latency: float  # seconds to the response headers, retries included
+    seconds: float  # to the end of the body
+    retries: int
+
+
+class _Body(io.RawIOBase):
+    """Decompressed body of a response, counts the bytes read"""
+
+    def __init__(self, response: BaseHTTPResponse):
+        self._response = response
+        self.bytes = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._response.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes += size
+        return size
+
+
+class Client:
+    """Pooled HTTP client, thread-safe, with the history of its downloads"""
+
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        backoff_max: float = BACKOFF_MAX,
+        maxsize: int = 8,
+        history: int = 100,
+    ):
+        import urllib3
+
+        retry = urllib3.Retry(
+            total=retries,
+            backoff_factor=backoff,
+            backoff_max=backoff_max,
+            status_forcelist=RETRY_STATUSES,
+            # a server asking for hours would block the reruns and the workers
+            retry_after_max=int(backoff_max),
+            # the last answer is returned, and reported with its status
+            raise_on_status=False,
+        )
+        self.pool: PoolManager = urllib3.PoolManager(
+            maxsize=maxsize,
+            block=False,
+            retries=retry,
+            timeout=urllib3.Timeout(connect=connect_timeout, read=read_timeout),
+            headers={"Accept-Encoding": "gzip"},
+        )
+        self.max_retries = retries
+        self.history: Deque[Download] = deque(maxlen=history)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _record(self, download: Download, failed: bool):
+        with self._lock:
+            self.history.append(download)
+            self.requests += 1
+            self.retries += download.retries
+            self.failures += failed
+
+    @contextmanager
+    def open_csv(self, url: str) -> Iterator[io.BufferedReader]:
+        """Body of a CSV answer as a binary file, decompressed while read.
+
+        Raises FetchError on an error status, a non CSV answer (the login
+        page of a sheet not shared) or a network error.
+        """
+        import urllib3
+
+        start = time.perf_counter()
+        try:
+            response = self.pool.request("GET", url, preload_content=False)
+        except urllib3.exceptions.HTTPError as exc:
+            reason = getattr(exc, "reason", None) or exc
+            seconds = time.perf_counter() - start
+            self._record(
+                Download(url, None, 0, 0, None, seconds, seconds, self.max_retries),
+                failed=True,
+            )
+            raise FetchError(str(reason)) from exc
+
+        latency = time.perf_counter() - start
+        retries = len(response.retries.history) if response.retries else 0
+        body = _Body(response)
+        failed = True
+        try:
+            if response.status != 200:
+                raise FetchError(f"HTTP {response.status}", response.status)
+            content_type = response.headers.get("Content-Type", "")
+            if "html" in content_type:
+                raise FetchError(f"not a CSV answer ({content_type})", response.status)
+            yield io.BufferedReader(body, 2**16)
+            failed = False
+        except urllib3.exceptions.HTTPError as exc:
+            # the connection broke or timed out while reading the body
+            raise FetchError(str(exc), response.status) from exc
+        finally:
+            self._record(
+                Download(
+                    url,
+                    response.status,
+                    response.tell(),
+                    body.bytes,
+                    response.headers.get("Content-Encoding"),
+                    latency,
+                    time.perf_counter() - start,
+                    retries,
+                ),
+                failed,
+            )
+            response.drain_conn()
+            response.release_conn()
+
+    def read_csv(self, url: str, **kwargs) -> DataFrame:
+        """``pd.read_csv`` of the answer, parsed while downloaded"""
+        import pandas as pd
+
+        with self.open_csv(url) as body:
+            return pd.read_csv(body, **kwargs)
+
+    def last(self, match: str = "") -> Optional[Download]:
+        """Latest download with ``match`` in the URL"""
+        with self._lock:
+            for download in reversed(self.history):
+                if match in download.url:
+                    return download
+        return None
+
+
+_client: Optional[Client] = None
+_client_lock = threading.Lock()
+
+
+def client() -> Client:
+    """Client shared by the process, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = Client()
+        return _client
+
+
+def open_csv(url: str):
+    return client().open_csv(url)
+
+
+def read_csv(url: str, **kwargs) -> DataFrame:
+    return client().read_csv(url, **kwargs)
@@ -0,0 +1,87 @@
+"""Bounded-memory ingestion of large CSV exports.
+
+The CSV is read in chunks, each chunk is normalized (``load_data``) and its
+columns appended to a columnar store. The raw frame of the whole sheet never
+exists, the peak memory is the normalized transactions plus a chunk.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    import numpy as np
+    from pandas import DataFrame
+
+CHUNKSIZE = 50_000  # rows
+
+
+class ColumnStore:
+    """Append-only store of frames with the same columns, one list of arrays per column"""
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+        self._arrays: Dict[str, List[np.ndarray]] = {}
+        self._index: List[np.ndarray] = []
+        self.rows = 0
+
+    def append(self, df: DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self._arrays = {column: [] for column in self.columns}
+        for column in self.columns:
+            self._arrays[column].append(df[column].to_numpy())
+        self._index.append(df.index.to_numpy())
+        self.rows += len(df)
+
+    def to_frame(self, sort_by: Optional[str] = None) -> DataFrame:
+        """Concatenate the chunks, optionally stable sorted by a column.
+
+        The store is emptied one column at a time, at most a column is held
+        twice in memory.
+        """
+        import numpy as np
+        import pandas as pd
+
+        order = None
+        if sort_by is not None:
+            order = np.argsort(np.concatenate(self._arrays[sort_by]), kind="stable")
+
+        def pop(chunks: List[np.ndarray]) -> np.ndarray:
+            values = np.concatenate(chunks)
+            chunks.clear()
+            return values if order is None else values.take(order)
+
+        index = pop(self._index)
+        data = {column: pop(self._arrays.pop(column)) for column in self.columns}
+        self.rows = 0
+        return pd.DataFrame(data, index=index, copy=False)
+
+
+def read_transactions(
+    source,
+    normalize: Callable[[DataFrame], DataFrame],
+    chunksize: int = CHUNKSIZE,
+) -> DataFrame:
+    """Read and normalize a CSV sheet chunk by chunk, rows sorted by date.
+
+    ``source`` is anything ``pd.read_csv`` accepts, ``normalize`` the cleaning
+    applied to each chunk. Row labels are the positions in the sheet, as if
+    the whole CSV were read at once.
+    """
+    import pandas as pd
+
+    store = ColumnStore()
+    # cells are kept as text, all the chunks get the same dtypes
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str):
+        store.append(normalize(chunk))
+    return store.to_frame(sort_by="date")
+
+
+def concat_transactions(frames: Sequence[DataFrame]) -> DataFrame:
+    """Normalized transactions of several sheets, sorted by date and relabeled"""
+    import pandas as pd
+
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(by="date", kind="stable", ignore_index=True)
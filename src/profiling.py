@@ -0,0 +1,151 @@
+"""Lightweight timing of the loading stages and of the dashboard sections.
+
+A profiler is started at every rerun, the stages run inside ``stage`` blocks:
+
+    with stage("load_dataset", rows=len(df)) as s:
+        data = load_dataset(df)
+        s.output(data.transactions)
+
+When the profiler is disabled ``stage`` returns a shared no-op object, so the
+instrumentation costs a function call and an attribute lookup.
+
+A fragment rerun runs a single section, outside of the rerun of the script:
+it is profiled on its own and logged as a rerun of its own.
+
+    with profiled(enabled, path):
+        with stage("section"):
+            ...
+"""
+from __future__ import annotations
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+
+class Stage:
+    __slots__ = ("name", "depth", "rows", "bytes", "seconds", "_profiler", "_start")
+
+    def __init__(self, profiler: "Profiler", name: str, rows: Optional[int]):
+        self.name = name
+        self.rows = rows
+        self.bytes = None
+        self.seconds = None
+        self.depth = 0
+        self._profiler = profiler
+
+    def output(self, df: Optional[DataFrame]):
+        """Record size and (shallow) memory of the frame produced by the stage"""
+        if df is not None:
+            self.rows = len(df)
+            self.bytes = int(df.memory_usage(index=True, deep=False).sum())
+
+    def __enter__(self) -> "Stage":
+        self.depth = self._profiler._depth
+        self._profiler._depth += 1
+        self._profiler.stages.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self._profiler._depth -= 1
+
+    def as_dict(self) -> dict:
+        return dict(
+            name=self.name,
+            depth=self.depth,
+            seconds=self.seconds,
+            rows=self.rows,
+            bytes=self.bytes,
+        )
+
+
+class _NullStage:
+    def output(self, df: Optional[DataFrame]):
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.stages: List[Stage] = []
+        self.started = time.time()
+        self.finished = False
+        self._depth = 0
+
+    def stage(self, name: str, rows: Optional[int] = None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stage(self, name, rows)
+
+    def records(self) -> List[dict]:
+        return [s.as_dict() for s in self.stages if s.seconds is not None]
+
+    def write(self, path: Path):
+        """Append the stages of the rerun as a JSON line"""
+        if not self.enabled:
+            return
+        line = dict(started=self.started, stages=self.records())
+        with open(path, "a") as fp:
+            fp.write(json.dumps(line) + "\n")
+
+    def finish(self, path: Path):
+        """End of the rerun, its stages are appended to the log"""
+        self.write(path)
+        self.finished = True
+
+
+_IDLE = Profiler()
+_IDLE.finished = True  # outside of a rerun
+
+# every streamlit session reruns the script in its own thread
+_profiler: ContextVar[Profiler] = ContextVar("profiler", default=_IDLE)
+
+
+def start(enabled: bool) -> Profiler:
+    """New profiler for the current rerun"""
+    profiler = Profiler(enabled)
+    _profiler.set(profiler)
+    return profiler
+
+
+def current() -> Profiler:
+    return _profiler.get()
+
+
+@contextmanager
+def profiled(enabled: bool, path: Path) -> Iterator[Profiler]:
+    """Profiler of the code that may run outside of a rerun (a fragment): the
+    profiler of the running rerun, else a new one finished on exit"""
+    profiler = _profiler.get()
+    if not profiler.finished:
+        yield profiler
+        return
+
+    profiler = Profiler(enabled)
+    token = _profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _profiler.reset(token)
+        profiler.finish(path)
+
+
+def stage(name: str, rows: Optional[int] = None):
+    return _profiler.get().stage(name, rows)
@@ -0,0 +1,207 @@
+"""Background refresh of the datasets.
+
+A worker thread per source (a sheet or the sheets of a household, with the
+loading options) reloads the data every ``interval`` seconds and publishes an
+immutable, versioned ``Snapshot``. Publishing is a single reference swap: the
+reruns read the latest ready snapshot and never wait for a download, only the
+first load of a source blocks.
+
+A failed refresh keeps serving the previous snapshot and records the error.
+A worker whose snapshot was not read since the last load stops at the next
+refresh instead of downloading again, a worker refreshed on demand stops
+after ``max_idle`` seconds without reads. A stopped worker drops its snapshot,
+the next read of its source loads it again. A snapshot is also dropped when
+its data is evicted from the sheet cache (``release``), so the workers keep
+alive no more than the byte budget of the cache.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+DEFAULT_MAX_IDLE = 15 * 60  # seconds, of the workers refreshed on demand
+
+# refresh -> (data, errors of the sheets left out), ``refresh`` is False for
+# the first load, which may be served by the sheet cache
+Load = Callable[[bool], Tuple[Any, Dict[str, Exception]]]
+
+
+class Snapshot(NamedTuple):
+    version: int
+    data: Any
+    loaded_at: float
+    errors: Dict[str, Exception]  # sheets of a household not loaded
+
+
+class Refresher:
+    """Loads a source, then refreshes it from a daemon thread.
+
+    ``interval`` is read at every tick and can be changed while running,
+    None refreshes on demand only (``refresh_now``).
+    """
+
+    def __init__(
+        self,
+        load: Load,
+        interval: Optional[float] = None,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        name: str = "refresh",
+    ):
+        self.load = load
+        self.interval = interval
+        self.max_idle = max_idle
+        self.name = name
+        self.error: Optional[Exception] = None  # of the last attempt
+        self.failed_at: Optional[float] = None
+        self.attempts = 0
+        self.version = 0  # of the last snapshot, also after a release
+        self._snapshot: Optional[Snapshot] = None
+        self._loading = 0
+        self._last_read = time.time()
+        self._thread: Optional[threading.Thread] = None
+        self._first_load = threading.Lock()
+        self._done = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def snapshot(self) -> Snapshot:
+        """Latest snapshot, the first call loads it (raises on failure) and
+        starts the worker"""
+        self._last_read = time.time()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        # concurrent first reads wait for a single load, also after a release
+        with self._first_load:
+            snapshot = self._snapshot
+            if snapshot is None:
+                snapshot = self._attempt(refresh=False, raise_errors=True)
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=self.name, daemon=True
+                    )
+                    self._thread.start()
+        return snapshot
+
+    def release(self, data: Any) -> bool:
+        """Drop the snapshot if it holds ``data``, True if dropped"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.data is not data:
+            return False
+        self._snapshot = None
+        return True
+
+    def refresh_now(self, timeout: Optional[float] = None) -> bool:
+        """Wake the worker and wait for a load started after the call,
+        False on timeout or when stopped"""
+        if self.stopped:
+            return False
+        with self._done:
+            # a load already running may have read the old data
+            target = self.attempts + 1 + self._loading
+            self._wake.set()
+            return self._done.wait_for(lambda: self.attempts >= target, timeout)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _attempt(self, refresh: bool, raise_errors: bool = False) -> Optional[Snapshot]:
+        with self._done:
+            self._loading = 1
+        try:
+            data, errors = self.load(refresh)
+        except Exception as exc:
+            self.error, self.failed_at = exc, time.time()
+            if raise_errors:
+                raise
+            return None
+        else:
+            # the swap, readers get the old or the new snapshot, never a mix
+            self.version += 1
+            self._snapshot = Snapshot(self.version, data, time.time(), errors)
+            self.error = self.failed_at = None
+            return self._snapshot
+        finally:
+            with self._done:
+                self._loading = 0
+                self.attempts += 1
+                self._done.notify_all()
+
+    def _run(self):
+        last = time.time()
+        while True:
+            deadline = self._last_read + self.max_idle
+            if self.interval is not None:
+                deadline = min(deadline, last + self.interval)
+            woken = self._wake.wait(max(0.0, deadline - time.time()))
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            now = time.time()
+            if now - self._last_read >= self.max_idle:
+                self._stop.set()
+                break
+            if woken:
+                self._attempt(refresh=True)
+                last = time.time()
+            elif self.interval is not None and now - last >= self.interval:
+                if self._last_read < last:
+                    # nobody read the data since it was loaded
+                    self._stop.set()
+                    break
+                self._attempt(refresh=True)
+                last = time.time()
+
+        # nobody reads it, the memory goes back with the snapshot
+        self._snapshot = None
+
+
+class Refreshers:
+    """Workers of the process keyed by source, shared by all the sessions"""
+
+    def __init__(self, max_idle: float = DEFAULT_MAX_IDLE):
+        self.max_idle = max_idle
+        self._workers: Dict[Hashable, Refresher] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Load, interval: Optional[float] = None) -> Refresher:
+        """Worker of the source, created if missing or stopped. The last
+        caller sets the interval"""
+        with self._lock:
+            for stopped in [k for k, w in self._workers.items() if w.stopped]:
+                del self._workers[stopped]
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = Refresher(load, interval, self.max_idle, name=f"refresh {key}")
+                self._workers[key] = worker
+        worker.interval = interval
+        return worker
+
+    def release(self, key: Hashable, data: Any):
+        """Drop the snapshots holding ``data``, evicted from the cache under
+        ``key`` (a SheetCache eviction callback)"""
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            worker.release(data)
+
+    def stop(self):
+        with self._lock:
+            for worker in self._workers.values():
+                worker.stop()
+            self._workers.clear()
+
+    def __len__(self) -> int:
+        return len(self._workers)
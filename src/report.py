@@ -0,0 +1,179 @@
+"""Static reports of a sheet, one per year and one per month, without streamlit.
+
+    python src/report.py --url https://docs.google.com/spreadsheets/d/<id> --out reports
+    python src/report.py --csv sheet.csv --out reports --format json html --workers 4
+
+The sheet is normalized once, then the periods are spread across a process
+pool: every worker receives the dataset once, when it starts, and writes the
+reports of its periods. ``index.json`` lists the files of every period.
+"""
+import argparse
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dataset import Dataset
+from engine import (load_dataset, month_report, periods, read_fx_rates,
+                    year_report)
+from utils import extract_sheet_id, get_month_name
+
+FORMATS = ("json", "html")
+
+# (year, month), month is None for the report of the whole year
+Period = Tuple[int, Optional[int]]
+
+# set in every worker by _init_worker
+_data: Optional[Dataset] = None
+_out: Optional[Path] = None
+_formats: Sequence[str] = FORMATS
+
+
+def read_sheet(url: Optional[str] = None, csv: Optional[Path] = None):
+    import pandas as pd
+
+    if csv is not None:
+        return pd.read_csv(csv, dtype=str)
+
+    from sync import download_sheet
+
+    return download_sheet(extract_sheet_id(url))
+
+
+def report_name(period: Period) -> str:
+    year, month = period
+    return f"{year}" if month is None else f"{year}-{month:02d}"
+
+
+def build_report(data: Dataset, period: Period) -> Dict[str, Any]:
+    year, month = period
+    if month is None:
+        return year_report(data, year)
+    return month_report(data, year, month)
+
+
+def _table(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return "<p><i>No data for this period</i></p>"
+    head = "".join(f"<th>{html.escape(str(key))}</th>" for key in rows[0])
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row.values()) + "</tr>"
+        for row in rows
+    )
+    return f"<table><tr>{head}</tr>{body}</table>"
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    month = report.get("month")
+    title = f"{report['year']}"
+    if month is not None:
+        title = f"{get_month_name(month).capitalize()} {title}"
+
+    deltas = [
+        dict(compared_to=compare, **values) for compare, values in report["deltas"].items()
+    ]
+    parts = [
+        f"<h1>{html.escape(title)}</h1>",
+        f"<p>Incomes <b>{report['totals']['incomes']:.2f}</b>"
+        f" · Expenses <b>{report['totals']['expenses']:.2f}</b></p>",
+        "<h2>Deltas</h2>",
+        _table(deltas),
+    ]
+    if "trend" in report:
+        parts += ["<h2>Trend</h2>", _table(report["trend"])]
+    for side_title in ("incomes", "expenses"):
+        side = report[side_title]
+        parts += [
+            f"<h2>{side_title.capitalize()}</h2>",
+            "<h3>Top 5</h3>",
+            _table(side["top"]),
+            "<h3>Categories</h3>",
+            _table(side["categories"]),
+            "<h3>Tags</h3>",
+            _table(side["tags"]),
+        ]
+
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+        f"<title>{html.escape(title)}</title></head><body>\n"
+        + "\n".join(parts)
+        + "\n</body></html>\n"
+    )
+
+
+def write_report(
+    data: Dataset, period: Period, out: Path, formats: Sequence[str]
+) -> List[str]:
+    """Write the report of the period in every format, return the file names"""
+    report = build_report(data, period)
+    name = report_name(period)
+
+    files = []
+    if "json" in formats:
+        text = json.dumps(report, ensure_ascii=False, indent=1)
+        (out / f"{name}.json").write_text(text, encoding="utf-8")
+        files.append(f"{name}.json")
+    if "html" in formats:
+        (out / f"{name}.html").write_text(render_html(report), encoding="utf-8")
+        files.append(f"{name}.html")
+    return files
+
+
+def _init_worker(data: Dataset, out: Path, formats: Sequence[str]):
+    global _data, _out, _formats
+    _data, _out, _formats = data, out, formats
+
+
+def _write(period: Period) -> List[str]:
+    return write_report(_data, period, _out, _formats)
+
+
+def render_all(
+    data: Dataset, out: Path, formats: Sequence[str] = FORMATS, workers: int = 1
+) -> Dict[str, List[str]]:
+    """Reports of every year and month of the dataset, written in ``out``"""
+    out.mkdir(parents=True, exist_ok=True)
+
+    months = periods(data)
+    years = sorted({year for year, _ in months})
+    todo: List[Period] = [(year, None) for year in years] + months
+
+    if workers <= 1:
+        written = [write_report(data, period, out, formats) for period in todo]
+    else:
+        # a bare copy, without the memoized sides, is sent to each worker
+        bare = Dataset(transactions=data.transactions, cube=data.cube, tags=data.tags)
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(bare, out, formats)
+        ) as pool:
+            chunksize = max(1, len(todo) // (4 * workers))
+            written = list(pool.map(_write, todo, chunksize=chunksize))
+
+    index = {report_name(period): files for period, files in zip(todo, written)}
+    (out / "index.json").write_text(json.dumps(index, indent=1))
+    return index
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="link of a sheet shared with anyone")
+    source.add_argument("--csv", type=Path, help="CSV export of the Transactions sheet")
+    parser.add_argument(
+        "--fx", type=Path, default=None, help="CSV of dated FX rates (date, currency, rate)"
+    )
+    parser.add_argument("--out", type=Path, default=Path("reports"))
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(args)
+
+    rates = read_fx_rates(args.fx) if args.fx is not None else None
+    data = load_dataset(read_sheet(args.url, args.csv), rates=rates)
+    index = render_all(data, args.out, args.format, args.workers)
+    print(f"{len(index)} reports written in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Incremental download of the ``Transactions`` sheet.
+
+Telexpense only appends rows to the sheet, so the rows already downloaded are
+kept and only the ones after the high-water mark (the number of stored rows)
+are requested, through the ``offset`` clause of the gviz query language.
+
+The request starts ``overlap`` rows before the mark: if those rows still match
+the tail of the store the new rows are appended, otherwise the sheet was edited
+or shrunk and it is downloaded again from scratch. The sheets of a household are
+downloaded concurrently.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fetch import read_csv
+from utils import get_sheet_csv_url
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+OVERLAP = 5  # rows
+
+
+class SyncResult(NamedTuple):
+    frame: DataFrame
+    full: bool  # the whole sheet was downloaded
+    new_rows: int
+
+
+def download_sheet(
+    sheet_id: str, sheet_name: str = "Transactions", query: Optional[str] = None
+) -> DataFrame:
+    # cells are kept as text, the chunks of an incremental sync have the same
+    # dtypes whatever values they hold, load_data does the parsing
+    return read_csv(get_sheet_csv_url(sheet_id, sheet_name, query), dtype=str)
+
+
+def _same_rows(first: DataFrame, second: DataFrame) -> bool:
+    return first.reset_index(drop=True).equals(second.reset_index(drop=True))
+
+
+def sync_sheet(
+    sheet_id: str, stored: Optional[DataFrame] = None, overlap: int = OVERLAP
+) -> SyncResult:
+    """Bring ``stored`` up to date with the sheet, downloading the new rows only"""
+    if stored is None or len(stored) < overlap:
+        df = download_sheet(sheet_id)
+        return SyncResult(df, True, len(df))
+
+    mark = len(stored)
+    rows = download_sheet(sheet_id, query=f"select * offset {mark - overlap}")
+
+    head, new = rows.iloc[:overlap], rows.iloc[overlap:]
+    if (
+        len(head) < overlap
+        or list(rows.columns) != list(stored.columns)
+        or not _same_rows(head, stored.iloc[mark - overlap :])
+    ):
+        df = download_sheet(sheet_id)
+        return SyncResult(df, True, len(df))
+
+    if new.empty:
+        return SyncResult(stored, False, 0)
+
+    import pandas as pd
+
+    df = pd.concat([stored, new], ignore_index=True)
+    return SyncResult(df, False, len(new))
+
+
+def fetch_concurrently(
+    sheets: Dict[str, str], load: Callable[[str, str], DataFrame]
+) -> Tuple[Dict[str, DataFrame], Dict[str, Exception]]:
+    """Run ``load(owner, url)`` for every sheet in a thread pool.
+
+    Returns the frames and the errors, keyed by owner: a failing sheet does
+    not stop the others and the total time is the one of the slowest sheet.
+    """
+    frames, errors = {}, {}
+    if not sheets:
+        return frames, errors
+
+    with ThreadPoolExecutor(max_workers=len(sheets)) as pool:
+        futures = {
+            owner: pool.submit(load, owner, url) for owner, url in sheets.items()
+        }
+    for owner, future in futures.items():
+        try:
+            frames[owner] = future.result()
+        except Exception as exc:
+            errors[owner] = exc
+    return frames, errors
@@ -1,7 +1,20 @@
-import calendar
-import random
+"""Synthetic Telexpense sheets, for load tests, benchmarks and the fake sheet server.
 
-from lorem_text import lorem
+    python src/utility/artificial_data.py --rows 100000 --start 2005-01-01 --out sheet.csv
+
+The frame has the same layout of the ``Transactions`` sheet downloaded from the
+gviz endpoint, so it can be fed to ``load_data`` as is.
+"""
+import argparse
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+COLUMNS = ["Date", "Description", "Category", "Amount", "Account", "In main currency"]
+CURRENCIES = ["EUR", "USD", "GBP", "CHF", "JPY", "SEK", "NOK", "DKK", "PLN", "CZK"]
 
 accounts = ["Revolut", "HSBC", "Cash", "Savings"]
 # Expense Classes
@@ -49,90 +62,228 @@ income_ranges = {
     "Gifts and Bonuses": (50, 500),
 }
 
+words = [
+    "dinner", "lunch", "market", "rent", "bill", "ticket", "train", "taxi",
+    "pharmacy", "doctor", "cinema", "concert", "book", "course", "loan",
+    "haircut", "gym", "gift", "coffee", "pizza", "sushi", "fuel", "parking",
+    "insurance", "phone", "internet", "electricity", "water", "salary", "bonus",
+]
+
+tags = [
+    "holiday", "friends", "family", "work", "home", "car", "health", "sport",
+    "birthday", "christmas", "trip", "restaurant", "gifts", "kids", "pets",
+    "subscription", "bills", "wedding", "moving", "hobby",
+] + [f"project{i}" for i in range(20)]
+
+
+def _choice(rng: np.random.Generator, values: Sequence[str], size: int) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), size)]
+
+
+def _format_amount(amount: np.ndarray, comma_decimal: bool) -> np.ndarray:
+    if not comma_decimal:
+        return amount
+    return np.char.replace(np.char.mod("%.2f", amount), ".", ",").astype(object)
+
+
+def _descriptions(
+    rng: np.random.Generator,
+    rows: int,
+    missing_description_share: float,
+    tagged_share: float,
+    tags_per_row: Sequence[float],
+) -> np.ndarray:
+    description = pd.Series(_choice(rng, words, rows)).str.capitalize()
+    second = rng.random(rows) < 0.5
+    description[second] += " " + pd.Series(_choice(rng, words, rows))[second]
+
+    # a few tags are used a lot, most of them seldom (zipf-like)
+    weights = 1 / np.arange(1, len(tags) + 1)
+    counts = np.where(
+        rng.random(rows) < tagged_share,
+        rng.choice(np.arange(1, len(tags_per_row) + 1), rows, p=tags_per_row),
+        0,
+    )
+    drawn = np.asarray(tags, dtype=object)[
+        rng.choice(len(tags), (len(tags_per_row), rows), p=weights / weights.sum())
+    ]
+    for k, tag in enumerate(drawn):
+        description[counts > k] += " #" + pd.Series(tag)[counts > k]
+
+    description[rng.random(rows) < missing_description_share] = np.nan
+    return description.to_numpy()
+
+
+def generate(
+    rows: int = 10_000,
+    start: str = "2019-01-01",
+    end: Optional[str] = None,
+    seed: int = 0,
+    income_share: float = 0.15,
+    transfer_share: float = 0.04,
+    missing_description_share: float = 0.2,
+    tagged_share: float = 0.3,
+    tags_per_row: Sequence[float] = (0.7, 0.2, 0.1),
+    comma_decimal: bool = True,
+    currencies: Sequence[str] = (),
+) -> DataFrame:
+    """Random sheet of ``rows`` transactions between ``start`` and ``end`` (today).
+
+    Transfers are pairs of rows, the money leaves an account and enters
+    another one. With ``comma_decimal`` the amounts are strings like "-12,50".
+    With ``currencies`` every row gets one of them in a ``Currency`` column,
+    ``Amount`` is in that currency at the rates of ``fx_rates`` (same seed) and
+    ``In main currency`` in the first one.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or pd.Timestamp.today().normalize()
+
+    transfers = int(rows * transfer_share) // 2
+    rows = rows - 2 * transfers
 
-def generate_description():
-    return lorem.sentence()
+    # days are offsets from the start, formatted once per calendar day
+    calendar = pd.date_range(start, end, freq="D").strftime("%d/%m/%Y").to_numpy()
+    dates = rng.integers(0, len(calendar), rows + transfers)
 
+    # incomes and expenses, uniform in the range of their category
+    income = rng.random(rows) < income_share
+    classes = np.array(expense_classes + income_classes, dtype=object)
+    ranges = np.array(
+        [expense_ranges[c] for c in expense_classes]
+        + [income_ranges[c] for c in income_classes]
+    )
+    category = np.where(
+        income,
+        rng.integers(len(expense_classes), len(classes), rows),
+        rng.integers(0, len(expense_classes), rows),
+    )
+    amount = rng.uniform(ranges[category, 0], ranges[category, 1]).round(2)
+    amount = np.where(income, amount, -amount)
 
-def generate_random_date(year, month):
-    # Get the number of days in the given month
-    _, days_in_month = calendar.monthrange(year, month)
+    # transfers, the two rows share date and amount
+    transfer = rng.uniform(10, 1000, transfers).round(2)
+    source = rng.integers(0, len(accounts), transfers)
+    target = (source + rng.integers(1, len(accounts), transfers)) % len(accounts)
 
-    # Generate a random day within the month
-    day = random.randint(1, days_in_month)
+    df = DataFrame(
+        {
+            "Date": np.concatenate([dates[:rows], dates[rows:], dates[rows:]]),
+            "Description": np.concatenate(
+                [
+                    _descriptions(
+                        rng, rows, missing_description_share, tagged_share, tags_per_row
+                    ),
+                    np.full(2 * transfers, np.nan, dtype=object),
+                ]
+            ),
+            "Category": np.concatenate(
+                [classes[category], np.full(2 * transfers, "Transfer", dtype=object)]
+            ),
+            "Amount": np.concatenate([amount, -transfer, transfer]),
+            "Account": np.concatenate(
+                [
+                    _choice(rng, accounts, rows),
+                    np.asarray(accounts, dtype=object)[source],
+                    np.asarray(accounts, dtype=object)[target],
+                ]
+            ),
+        }
+    )
 
-    # Format the date as 'YYYY-MM-DD'
-    date_string = f"{year}-{month:02d}-{day:02d}"
+    # the sheet is filled day by day
+    df = df.sort_values(by="Date", kind="stable", ignore_index=True)
+    main = df["Amount"].to_numpy()
+    columns = COLUMNS
+    if currencies:
+        # the rates are drawn from their own generator, the sheet stays the same
+        rates = _rate_matrix(len(calendar), len(currencies), seed)
+        currency = np.random.default_rng(seed + 1).integers(0, len(currencies), len(df))
+        rate = rates[df["Date"].to_numpy(), currency]
+        df["Currency"] = np.asarray(currencies, dtype=object)[currency]
+        df["Amount"] = (main / rate).round(2)
+        columns = COLUMNS + ["Currency"]
 
-    return date_string
+    df["Date"] = calendar[df["Date"].to_numpy()]
+    df["In main currency"] = _format_amount(main, comma_decimal)
+    df["Amount"] = _format_amount(df["Amount"].to_numpy(), comma_decimal)
+    return df[columns]
 
 
-def generate_income(category):
-    return round(random.uniform(*income_ranges[category]), 2)
+def _rate_matrix(days: int, currencies: int, seed: int) -> np.ndarray:
+    """Daily value of each currency in the first one, a random walk"""
+    rng = np.random.default_rng(seed + 2)
+    base = np.exp(rng.normal(0, 1, currencies))
+    walk = np.exp(np.cumsum(rng.normal(0, 0.005, (days, currencies)), axis=0))
+    rates = base * walk
+    rates[:, 0] = 1.0
+    return rates
 
 
-def generate_expense(category):
-    return round(-random.uniform(*expense_ranges[category]), 2)
+def fx_rates(
+    currencies: Sequence[str],
+    start: str = "2019-01-01",
+    end: Optional[str] = None,
+    seed: int = 0,
+) -> DataFrame:
+    """Daily FX rates of the sheet generated with the same arguments, the
+    value of one unit of each currency in the first one (left out)"""
+    end = end or pd.Timestamp.today().normalize()
+    calendar = pd.date_range(start, end, freq="D").strftime("%Y-%m-%d").to_numpy()
+    rates = _rate_matrix(len(calendar), len(currencies), seed)[:, 1:]
+    others = np.asarray(currencies[1:], dtype=object)
 
+    return DataFrame(
+        {
+            "date": np.repeat(calendar, len(others)),
+            "currency": np.tile(others, len(calendar)),
+            "rate": rates.ravel().round(6),
+        }
+    )
 
-def generate_entry(month, year, typ):
-    if typ == "inc":
-        category = random.choice(income_classes)
-        return (
-            category,
-            generate_income(category),
-            generate_description(),
-            generate_random_date(year, month),
-            random.choice(accounts),
-        )
+
+def write(df: DataFrame, path: Path):
+    """Write the sheet as CSV, Parquet or Excel, chosen by the file extension"""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    elif path.suffix == ".xlsx":
+        df.to_excel(path, index=False)
     else:
-        category = random.choice(expense_classes)
-        return (
-            category,
-            generate_expense(category),
-            generate_description(),
-            generate_random_date(year, month),
-            random.choice(accounts),
-        )
-
-
-def generate_month(month, year):
-    entries = []
-    for i in range(random.randint(2, 10)):
-        entries.append(generate_entry(month, year, "inc"))
-    for i in range(random.randint(20, 30)):
-        entries.append(generate_entry(month, year, "exp"))
-
-    return entries
-
-
-def generate():
-    entries = []
-    for year in range(2019, 2024):
-        for month in range(1, 13):
-            entries.extend(generate_month(month, year))
-    entries.extend(generate_month(1, 2024))
-
-    import pandas as pd
-
-    entries = {
-        k: l
-        for l, k in zip(
-            tuple(zip(*entries)),
-            ["Category", "Amount", "Description", "Date", "Account"],
-        )
-    }
-    df = pd.DataFrame(entries)
-    df["Date"] = pd.to_datetime(df["Date"])
-    df["Date"] = pd.to_datetime(df["Date"].dt.strftime("%m-%d-%Y"))
-    df["In main currency"] = df["Amount"]
-    print(df.groupby(by=[df.Date.dt.year, df.Date.dt.month]).Category.count())
-    df = df[
-        ["Date", "Description", "Category", "Amount", "Account", "In main currency"]
-    ]
-    df.to_excel("prova.xlsx")
+        df.to_csv(path, index=False)
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--start", default="2019-01-01")
+    parser.add_argument("--end", default=None, help="defaults to today")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dot-decimal", action="store_true", help="numeric amounts, no commas"
+    )
+    parser.add_argument(
+        "--currencies", nargs="+", default=[], help="the first one is the main currency"
+    )
+    parser.add_argument("--fx-out", type=Path, default=None, help="CSV of the FX rates")
+    parser.add_argument("--out", type=Path, default=Path("sheet.csv"))
+    args = parser.parse_args(args)
+
+    df = generate(
+        args.rows,
+        args.start,
+        args.end,
+        seed=args.seed,
+        comma_decimal=not args.dot_decimal,
+        currencies=args.currencies,
+    )
+    write(df, args.out)
+    print(f"{len(df)} transactions written to {args.out}")
+
+    if args.fx_out is not None:
+        rates = fx_rates(args.currencies, args.start, args.end, args.seed)
+        rates.to_csv(args.fx_out, index=False)
+        print(f"{len(rates)} FX rates written to {args.fx_out}")
 
 
-generate()
-for cl in income_classes:
-    print(cl)
+if __name__ == "__main__":
+    main()
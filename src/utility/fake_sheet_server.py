@@ -0,0 +1,202 @@
+"""Local stand-in for the Google Sheets gviz CSV endpoint.
+
+Serves ``/spreadsheets/d/<sheet_id>/gviz/tq?tqx=out:csv&sheet=<name>`` from
+in-memory CSV texts, point the visualizer to it with the
+``TELEXPENSE_VIZ_GVIZ_URL`` environment variable.
+
+The ``tq`` parameter honors a subset of the query language: ``select *`` or
+``select count(A)``, followed by optional ``limit`` and ``offset`` clauses.
+
+Faults can be injected: a ``delay`` before every answer and a queue of
+``failures``, the statuses of the next answers, with a ``Retry-After`` header
+when ``retry_after`` is set. Bodies are gzipped for the clients that accept it.
+
+    python src/utility/fake_sheet_server.py sheet.csv --sheet-id demo --port 8000
+    python src/utility/fake_sheet_server.py sheet.csv --delay 0.5 --fail 503 429
+"""
+import argparse
+import csv
+import gzip
+import io
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+_PATH_RE = re.compile(r"^/spreadsheets/d/([a-zA-Z0-9-_]+)/gviz/tq$")
+_QUERY_RE = re.compile(
+    r"^\s*select\s+(\*|count\(A\))(?:\s+limit\s+(\d+))?(?:\s+offset\s+(\d+))?\s*$",
+    re.IGNORECASE,
+)
+
+
+def run_query(text: str, query: str) -> str:
+    """Apply a ``tq`` query to a CSV text, raises ValueError if not supported"""
+    match = _QUERY_RE.match(query)
+    if match is None:
+        raise ValueError(f"unsupported query: {query}")
+    columns, limit, offset = match.groups()
+
+    header, *rows = list(csv.reader(io.StringIO(text)))
+    rows = rows[int(offset or 0) :]
+    if limit is not None:
+        rows = rows[: int(limit)]
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if columns == "*":
+        writer.writerow(header)
+        writer.writerows(rows)
+    else:
+        writer.writerow([f"count {header[0]}"])
+        writer.writerow([sum(1 for row in rows if row and row[0])])
+    return out.getvalue()
+
+
+class FakeSheetServer:
+    def __init__(
+        self,
+        sheets: Dict[str, str],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+        failures: Sequence[int] = (),
+        retry_after: Optional[int] = None,
+        gzip: bool = True,
+    ):
+        self.sheets = sheets
+        self.delay = delay  # seconds before every answer
+        self.failures: List[int] = list(failures)  # statuses of the next answers
+        self.retry_after = retry_after  # seconds, sent with the failures
+        self.gzip = gzip
+        self.requests = 0
+        self.connections = 0
+        self.bytes_sent = 0
+        self.queries: List[str] = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, every answer has a Content-Length
+            protocol_version = "HTTP/1.1"
+            # headers and body are two writes, do not wait for the ACK of the first
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def do_GET(self):
+                fake.requests += 1
+                if fake.delay:
+                    time.sleep(fake.delay)
+                try:
+                    status = fake.failures.pop(0)
+                except IndexError:
+                    status = None
+                if status is not None and fake.retry_after is not None:
+                    self.send_response(status)
+                    self.send_header("Retry-After", str(fake.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if status is not None:
+                    self.send_error(status)
+                    return
+
+                url = urlparse(self.path)
+                match = _PATH_RE.match(url.path)
+                query = parse_qs(url.query)
+
+                if match is None or match.group(1) not in fake.sheets:
+                    self.send_error(404)
+                    return
+                if query.get("sheet", ["Transactions"])[0] != "Transactions":
+                    self.send_error(400)
+                    return
+
+                body = fake.sheets[match.group(1)]
+                if "tq" in query:
+                    fake.queries.append(query["tq"][0])
+                    try:
+                        body = run_query(body, query["tq"][0])
+                    except ValueError:
+                        self.send_error(400)
+                        return
+
+                body = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                if fake.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up, e.g. on a read timeout
+                    return
+                fake.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeSheetServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeSheetServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(args: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve a CSV sheet as a fake gviz endpoint")
+    parser.add_argument("csv", type=Path, help="e.g. written by artificial_data.py")
+    parser.add_argument("--sheet-id", default="demo")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds before every answer")
+    parser.add_argument(
+        "--fail", type=int, nargs="*", default=[], help="statuses of the first answers"
+    )
+    parser.add_argument("--retry-after", type=int, default=None, help="seconds, with --fail")
+    args = parser.parse_args(args)
+
+    server = FakeSheetServer(
+        {args.sheet_id: args.csv.read_text()},
+        port=args.port,
+        delay=args.delay,
+        failures=args.fail,
+        retry_after=args.retry_after,
+    )
+    print(f"TELEXPENSE_VIZ_GVIZ_URL={server.url}")
+    print(f"Sheet URL: https://docs.google.com/spreadsheets/d/{args.sheet_id}/edit")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
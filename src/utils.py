@@ -1,7 +1,9 @@
 import os
+import re
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple, Dict, Optional
+from urllib.parse import quote
 
 
 def get_link_file_path() -> Path:
@@ -9,6 +11,64 @@ def get_link_file_path() -> Path:
     return path
 
 
+_SHEET_ID_RE = re.compile(r"/spreadsheets/d/([a-zA-Z0-9-_]+)")
+# the id names the cache files, the whole value must be a plain id
+_SHEET_KEY_RE = re.compile(r"[?&]key=([a-zA-Z0-9-_]+)(?:[&#]|$)")
+
+
+class InvalidSheetUrl(ValueError):
+    pass
+
+
+def extract_sheet_id(url: str) -> str:
+    """Id of a Google Sheet from its URL, new (/d/<id>) or old (?key=<id>) style"""
+    match = _SHEET_ID_RE.search(url) or _SHEET_KEY_RE.search(url)
+    if match is None:
+        raise InvalidSheetUrl(url)
+    return match.group(1)
+
+
+def parse_sheets(text: str) -> Dict[str, str]:
+    """Household sheets, one ``owner<TAB or spaces>url`` per line, keyed by owner"""
+    sheets = {}
+    for line in text.splitlines():
+        parts = line.strip().rsplit(maxsplit=1)
+        if len(parts) == 2:
+            sheets[parts[0].strip()] = parts[1]
+    return sheets
+
+
+def format_sheets(sheets: Dict[str, str]) -> str:
+    return "".join(f"{owner}\t{url}\n" for owner, url in sheets.items())
+
+
+def get_cache_dir_path() -> Path:
+    path = Path(os.path.join(Path.home(), ".telexpense-viz-cache"))
+    return path
+
+
+def get_perf_log_path() -> Path:
+    path = Path(os.path.join(Path.home(), ".telexpense-viz-perf.jsonl"))
+    return path
+
+
+def get_fx_file_path() -> Path:
+    path = Path(os.path.join(Path.home(), ".telexpense-viz-fx.csv"))
+    return path
+
+
+def get_sheet_csv_url(
+    sheet_id: str, sheet_name: str = "Transactions", query: Optional[str] = None
+) -> str:
+    # the base url can be overridden to point to a local fake sheet server
+    base_url = os.environ.get("TELEXPENSE_VIZ_GVIZ_URL", "https://docs.google.com")
+    url = f"{base_url}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
+    if query:
+        # the first row of the sheet is always the header
+        url += f"&headers=1&tq={quote(query)}"
+    return url
+
+
 def get_icon(title: str):
     return "📉" if title == "expenses" else "📈"
 
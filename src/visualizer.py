@@ -1,17 +1,53 @@
-import streamlit as st
-import re
-from typing import Literal, Optional, Sequence, Tuple
-# loading file errors
-from urllib.error import HTTPError
-
-import pandas as pd
-from gspread.exceptions import NoValidUrlKeyFound
-from gspread.utils import extract_id_from_url
-from pandas import DataFrame, Series
+from __future__ import annotations
 
-from utils import (_AMOUNT_FORMAT, _AMOUNT_PERC_FORMAT, _r, _tag, _untag,
-                   delta, get_curr_month_year, get_icon, get_link_file_path,
-                   get_prev_month_year, get_month_idx, get_month_name)
+import hashlib
+import math
+import streamlit as st
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import (TYPE_CHECKING, Callable, Dict, List, Literal, Optional,
+                    Sequence, Tuple)
+import profiling
+from cache import DEFAULT_TTL, SheetCache
+from dataset import (Dataset, SearchIndex, compact_transactions,
+                     memory_report, page_by_amount, tag_lists)
+from engine import (COMPARISONS, ROLLING_WINDOWS, compare_month, inc_exp_sum,
+                    load_data, load_dataset, overall_frames, read_fx_rates,
+                    select_month_year, tag_totals, top_five, trend_frames,
+                    year_totals, year_trend)
+from fetch import FetchError, client, open_csv
+from ingest import concat_transactions, read_transactions
+from profiling import stage
+from refresh import Refresher, Refreshers, Snapshot
+from sync import SyncResult, download_sheet, fetch_concurrently, sync_sheet
+from utils import (_AMOUNT_FORMAT, _AMOUNT_PERC_FORMAT, InvalidSheetUrl, _r,
+                   _tag, _untag, delta, extract_sheet_id, format_sheets,
+                   get_curr_month_year, get_fx_file_path, get_icon,
+                   get_link_file_path, get_prev_month_year, get_month_idx,
+                   get_month_name, get_perf_log_path, get_sheet_csv_url,
+                   parse_sheets)
+
+# pandas, numpy and plotly are imported where used, the URL box is shown
+# without loading them
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+_PAGE_SIZES = [10, 25, 50, 100]
+
+# shared by all the reruns, lives as long as the streamlit process
+_refreshers = Refreshers()
+# a dataset evicted from the cache is not kept alive by a worker either
+_sheet_cache = SheetCache(on_evict=_refreshers.release)
+_sync_results: Dict[str, SyncResult] = {}
+
+
+class NoSheetLoaded(Exception):
+    """None of the sheets of a household could be loaded"""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        super().__init__(", ".join(errors))
+        self.errors = errors
 
 
 def get_placeholder() -> str:
@@ -19,14 +55,19 @@ def get_placeholder() -> str:
     if path.exists():
         with path.open() as fp:
             url = fp.read()
+            # a household is stored as owner<TAB>url lines
+            sheets = parse_sheets(url) if "\t" in url else None
+            if sheets:
+                st.session_state.sheets = sheets
+                url = next(iter(sheets.values()))
             st.session_state.url = url
             return url
 
 
-def set_placeholder(url: str):
+def set_placeholder(url: str, sheets: Optional[Dict[str, str]] = None):
     path = get_link_file_path()  # Path("sheet.txt")
     with open(path, "w") as fp:
-        fp.write(url)
+        fp.write(format_sheets(sheets) if sheets else url)
 
 
 def load_url(local_cache: bool = True):
@@ -40,11 +81,25 @@ def load_url(local_cache: bool = True):
             placeholder = None
         url = st.text_input("Sheet URL", placeholder, label_visibility="collapsed")
 
+    with st.expander("👪 Household"):
+        household = st.text_area(
+            "One sheet per line, the owner and the URL",
+            format_sheets(st.session_state.get("sheets", {})),
+            placeholder="alice https://docs.google.com/spreadsheets/d/...",
+            key="household",
+        )
+
     with button:
         if st.button("Start"):
+            sheets = parse_sheets(household)
+            if sheets:
+                st.session_state.sheets = sheets
+                url = url or next(iter(sheets.values()))
+            else:
+                st.session_state.pop("sheets", None)
             st.session_state.url = url
             if local_cache:
-                set_placeholder(url)
+                set_placeholder(url, sheets)
 
 
 def error_page(error: str):
@@ -57,74 +112,339 @@ def error_page(error: str):
     st.image("guide.gif", caption="Guide to use the visualizer")
 
 
-def load_dataframe(url: str) -> DataFrame:
-    sheet_name = "Transactions"
+def error_message(exc: Exception) -> str:
+    if isinstance(exc, FetchError):
+        if exc.status is None:
+            return f"Google Sheets could not be reached ({exc})"
+        if exc.status == 429 or exc.status >= 500:
+            return f"Google Sheets is not answering (HTTP {exc.status}), try again later"
+        return "Check if the sheet is **shared** or if the URL is correct"
+    if isinstance(exc, InvalidSheetUrl):
+        return "Something wrong with the URL, check it!"
+    if isinstance(exc, NoSheetLoaded):
+        return "No sheet could be loaded"
+    return "General error"
+
+
+def sheet_key(url: str, streaming: bool = False, owner: Optional[str] = None) -> str:
+    """Key of the sheet in the shared cache, raw or normalized while streaming"""
     try:
-        sheet_id = extract_id_from_url(url)
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}"
-        df = pd.read_csv(url)
-        return df
-    except HTTPError:
-        error_page("Check if the sheet is **shared** or if the URL is correct")
-    except NoValidUrlKeyFound:
-        error_page("Something wrong with the URL, check it!")
-    except Exception:
-        error_page("General error")
-    return None
+        key = extract_sheet_id(url)
+    except InvalidSheetUrl:
+        # never downloaded, the key only versions a dataset without this sheet
+        key = "invalid-" + hashlib.sha1(url.encode()).hexdigest()
+    if streaming:
+        key += ".transactions" + (f".{owner}" if owner is not None else "")
+    return key
+
+
+def fetch_dataframe(
+    url: str,
+    ttl: Optional[float] = None,
+    refresh: bool = False,
+    incremental: bool = False,
+) -> DataFrame:
+    """Raw sheet, through the cache, raises on download errors"""
+    sheet_id = extract_sheet_id(url)
+
+    def fetch() -> DataFrame:
+        if incremental:
+            # the stale copy is the starting point of the sync
+            stored = _sheet_cache.get(sheet_id, ttl=math.inf)
+            result = sync_sheet(sheet_id, stored)
+        else:
+            df = download_sheet(sheet_id)
+            result = SyncResult(df, True, len(df))
+        _sync_results[sheet_id] = result
+        return result.frame
 
+    return _sheet_cache.get_or_fetch(sheet_id, fetch, ttl=ttl, refresh=refresh)
+
+
+@lru_cache(maxsize=1)
+def _read_fx_rates(path: Path, mtime: float) -> DataFrame:
+    # read again when the file changes
+    return read_fx_rates(path)
 
-def header(title: str):
-    st.header(title, divider="rainbow")
 
+def fx_rates() -> Optional[DataFrame]:
+    """FX rates of the local table, None if missing or invalid. They convert the
+    rows of a sheet with a ``Currency`` column but no amount in the main currency"""
+    path = get_fx_file_path()
+    try:
+        return _read_fx_rates(path, path.stat().st_mtime)
+    except Exception:
+        return None
 
-def load_data(df: DataFrame) -> DataFrame:
-    df = df[["Date", "Category", "Amount", "Account", "Description"]]
 
-    # lower all the columns' names
-    df = df.rename(columns={col: col.lower() for col in df.columns})
+def fetch_transactions(
+    url: str,
+    ttl: Optional[float] = None,
+    refresh: bool = False,
+    owner: Optional[str] = None,
+) -> DataFrame:
+    """Normalized transactions read chunk by chunk, the raw sheet is never materialized"""
+    sheet_id = extract_sheet_id(url)
+    rates = fx_rates()
+    normalize = lambda chunk: load_data(chunk, rates)
+    if owner is not None:
+        normalize = lambda chunk: load_data(chunk.assign(Owner=owner), rates)
+
+    def fetch() -> DataFrame:
+        with open_csv(get_sheet_csv_url(sheet_id)) as body:
+            return read_transactions(body, normalize)
+
+    # kept in memory only, the lists of tags do not round trip to parquet
+    return _sheet_cache.get_or_fetch(
+        sheet_key(url, streaming=True, owner=owner),
+        fetch,
+        ttl=ttl,
+        refresh=refresh,
+        persist=False,
+    )
 
-    # remove transfer entries, are not relevant for the analysis
-    df = df.query("category != 'Transfer'")
 
-    # replace possible commas in the numbers, so can be correcly casted to numerical
-    df["amount"] = df["amount"].apply(
-        lambda value: value.replace(",", ".") if isinstance(value, str) else value
+def shared_dataset(
+    keys: Sequence[str], compact: bool, build: Callable[[], Dataset]
+) -> Dataset:
+    """Dataset of the cached sheets ``keys``, built once per version of the sheets
+    and shared by all the sessions that loaded the same ones"""
+    version = "+".join(f"{key}@{_sheet_cache.fetched_at(key)}" for key in sorted(keys))
+    return _sheet_cache.get_or_fetch(
+        f"{version}.dataset" + (".compact" if compact else ""),
+        build,
+        ttl=math.inf,
+        persist=False,
     )
 
-    df["date"] = pd.to_datetime(df["date"], dayfirst=True)
-    df["amount"] = pd.to_numeric(df["amount"])
 
-    # flag usefull for code readability
-    df["expense"] = df["amount"].apply(lambda value: value < 0)
+def load_household(
+    sheets: Dict[str, str],
+    ttl: Optional[float] = None,
+    refresh: bool = False,
+    incremental: bool = False,
+    streaming: bool = False,
+) -> Tuple[DataFrame, Dict[str, Exception]]:
+    """Normalized transactions of all the sheets, with the ``owner`` of each row.
+
+    The sheets are downloaded and normalized concurrently, a failing sheet is
+    left out and its error returned, raises when no sheet could be loaded.
+    """
+
+    def load(owner: str, url: str) -> DataFrame:
+        if streaming:
+            return fetch_transactions(url, ttl, refresh, owner)
+        df = fetch_dataframe(url, ttl, refresh, incremental)
+        return load_data(df.assign(Owner=owner), fx_rates())
+
+    frames, errors = fetch_concurrently(sheets, load)
+    if not frames:
+        raise NoSheetLoaded(errors)
+    return concat_transactions(list(frames.values())), errors
+
+
+def load_source(
+    url: str,
+    sheets: Optional[Dict[str, str]],
+    ttl: Optional[float] = None,
+    refresh: bool = False,
+    incremental: bool = False,
+    streaming: bool = False,
+    compact: bool = False,
+) -> Tuple[Dataset, Dict[str, Exception]]:
+    """Dataset of the sheet, or of the sheets of a household, and the errors of
+    the sheets left out. Raises when nothing could be loaded"""
+    errors = {}
+    if sheets or streaming:
+        with stage("load_transactions") as s:
+            if sheets:
+                transactions, errors = load_household(
+                    sheets, ttl, refresh, incremental, streaming
+                )
+            else:
+                transactions = fetch_transactions(url, ttl, refresh)
+            s.output(transactions)
+        rows = len(transactions)
+        urls = sheets or {None: url}
+        keys = [sheet_key(url, streaming, owner) for owner, url in urls.items()]
+        build = lambda: Dataset.from_transactions(transactions, compact)
+    else:
+        with stage("load_dataframe") as s:
+            df = fetch_dataframe(url, ttl, refresh, incremental)
+            s.output(df)
+        rows = len(df)
+        keys = [sheet_key(url)]
+        build = lambda: load_dataset(df, compact, fx_rates())
+
+    with stage("load_dataset", rows) as s:
+        data = shared_dataset(keys, compact, build)
+        s.output(data.transactions)
+    return data, errors
+
+
+def cache_controls() -> Tuple[float, bool]:
+    """Sidebar controls of the sheet cache, returns the ttl and the refresh flag"""
+    with st.sidebar:
+        st.write("**🗄️ Cache**")
+        ttl = st.number_input(
+            "Refresh data every (minutes)",
+            min_value=0,
+            value=DEFAULT_TTL // 60,
+            step=5,
+            key="cache_ttl",
+            help="The data is refreshed in the background, 0 to refresh it only on demand",
+        )
+        refresh = st.button("Refresh now", key="cache_refresh")
+    return ttl * 60, refresh
+
+
+def sync_controls() -> Tuple[bool, bool]:
+    """Sidebar controls of the incremental sync, returns the mode and the resync flag"""
+    with st.sidebar:
+        incremental = st.toggle(
+            "Incremental sync",
+            key="sync_incremental",
+            help="Download only the rows appended since the last load",
+        )
+        resync = incremental and st.button("Full resync", key="sync_resync")
+    return incremental, resync
+
 
-    df["amount"] = df["amount"].apply(abs)
+def cache_info(url: str):
+    try:
+        sheet_id = extract_sheet_id(url)
+    except InvalidSheetUrl:
+        return
+
+    age = _sheet_cache.age(sheet_id)
+    if age is not None:
+        st.sidebar.caption(
+            f"Data downloaded {int(age // 60)} min ago · "
+            f"cache hit rate {_sheet_cache.hit_rate:.0%} · "
+            f"{_sheet_cache.size / 2**20:.0f} MB shared, "
+            f"{_sheet_cache.evictions} evicted"
+        )
 
-    # find tags
-    df["tags"] = df["description"].apply(
-        lambda desc: re.findall("#([a-zA-Z0-9_-]+)", desc)
-        if isinstance(desc, str)
-        else []
+    result = _sync_results.get(sheet_id)
+    if result is not None:
+        sync = "full download" if result.full else "incremental"
+        st.sidebar.caption(f"Last sync: {sync}, {result.new_rows} new rows")
+
+    download = client().last(f"/d/{sheet_id}/")
+    if download is not None and download.status == 200:
+        size = lambda n: f"{n / 2**20:.1f} MB" if n >= 2**20 else f"{n / 2**10:.0f} kB"
+        retries = f", {download.retries} retries" if download.retries else ""
+        st.sidebar.caption(
+            f"Last download: {size(download.wire_bytes)} on the wire"
+            f" ({size(download.bytes)} of CSV), first byte after"
+            f" {download.latency:.2f} s, {download.seconds:.2f} s in total{retries}"
+        )
+
+
+def refresh_info(worker: Refresher, snapshot: Snapshot):
+    """Version of the data shown, and a warning when the last refresh failed"""
+    loaded_at = datetime.fromtimestamp(snapshot.loaded_at)
+    every = (
+        f"refreshed every {worker.interval / 60:g} min"
+        if worker.interval
+        else "refreshed on demand"
+    )
+    st.sidebar.caption(
+        f"🔄 Data version {snapshot.version} of {loaded_at:%d/%m/%Y %H:%M:%S}, {every}"
     )
 
-    # remove tags from description
-    df["description"] = df["description"].apply(
-        lambda desc: re.sub("#([a-zA-Z0-9_-]+)", "", desc)
-        if isinstance(desc, str)
-        else []
+    if worker.error is not None:
+        failed_at = datetime.fromtimestamp(worker.failed_at)
+        st.warning(
+            f"⚠️ Refresh failed at {failed_at:%H:%M:%S}. {error_message(worker.error)}."
+            f" Showing the data of {loaded_at:%d/%m/%Y %H:%M:%S}"
+        )
+    for owner, exc in snapshot.errors.items():
+        st.warning(f"⚠️ Sheet of **{owner}** not loaded. {error_message(exc)}")
+
+
+def fx_info():
+    path = get_fx_file_path()
+    if not path.exists():
+        return
+    try:
+        rates = _read_fx_rates(path, path.stat().st_mtime)
+    except Exception as exc:
+        st.sidebar.warning(f"⚠️ FX rates in {path} not loaded: {exc}")
+        return
+    st.sidebar.caption(
+        f"💱 FX rates of {rates.currency.nunique()} currencies, "
+        f"up to {rates.date.max():%d/%m/%Y}"
     )
 
-    return df
 
+def debug_panel(data: Dataset, plain: Callable[[], DataFrame]):
+    """Sidebar panel with the memory used by the plain and compact transactions"""
+    with st.sidebar.expander("🐞 Debug"):
+        if st.toggle("Memory report", key="debug_memory"):
+            plain = plain()
+            report = memory_report(plain, compact_transactions(plain), data.tags)
+            st.dataframe(
+                report,
+                column_config={
+                    "column": "Column",
+                    "before": st.column_config.NumberColumn("Plain (B)", format="%d"),
+                    "after": st.column_config.NumberColumn("Compact (B)", format="%d"),
+                    "ratio": st.column_config.NumberColumn("Ratio", format="%.2f"),
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
 
-def get_trend(
-    df: DataFrame, temporal_period: Sequence[int], categories: Series
-) -> DataFrame:
-    df = (
-        df.groupby(by=[temporal_period, categories])
-        .amount.sum()
-        .reset_index(name="amount")
+
+def owner_filter(data: Dataset) -> Optional[List[str]]:
+    """Sidebar filter of the owners of a household, applies to every section.
+    None for a single sheet"""
+    if not data.owners:
+        return None
+    return st.sidebar.multiselect(
+        "👪 Owners", data.owners, default=data.owners, key="owners"
     )
-    return df
+
+
+def select_owners(data: Dataset, owners: Optional[Sequence[str]]) -> Dataset:
+    if owners is None or set(owners) == set(data.owners):
+        return data
+    return data.with_owners(owners)
+
+
+def performance_panel(profiler: profiling.Profiler):
+    """Sidebar panel with the timings of the rerun, also appended to a JSON lines log"""
+    profiler.finish(get_perf_log_path())
+    if not profiler.enabled:
+        return
+
+    import pandas as pd
+
+    records = pd.DataFrame(profiler.records())
+    # nested stages are indented under their parent
+    records["name"] = [
+        "\u2003" * depth + name for depth, name in zip(records.depth, records.name)
+    ]
+    records["bytes"] = records["bytes"] / 2**20
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.dataframe(
+            records[["name", "seconds", "rows", "bytes"]],
+            column_config={
+                "name": "Stage",
+                "seconds": st.column_config.NumberColumn("Time (s)", format="%.3f"),
+                "rows": st.column_config.NumberColumn("Rows", format="%d"),
+                "bytes": st.column_config.NumberColumn("Output (MiB)", format="%.1f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+        total = records.loc[records.depth == 0, "seconds"].sum()
+        st.caption(f"Rerun took {total:.3f} s, log in {get_perf_log_path()}")
+
+
+def header(title: str):
+    st.header(title, divider="rainbow")
 
 
 def plot_trend_line(df: DataFrame, key: str):
@@ -138,17 +458,13 @@ def plot_trend_line(df: DataFrame, key: str):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def plot_trend_bars(df: DataFrame):
+def plot_trend_bars(totals: DataFrame):
     import plotly.graph_objects as go
 
-    df = df.groupby("category").amount.sum().reset_index(name="amount")
-    values = list(zip(df["amount"].values, df["category"].values))
-    values = sorted(values, reverse=False)
-
     fig = go.Figure(
         go.Bar(
-            x=[v for v, _ in values],
-            y=[k for _, k in values],
+            x=totals["amount"].to_numpy(),
+            y=totals["category"].to_numpy(),
             orientation="h",
             marker=dict(
                 color="rgba(90,10,170,0.4)",
@@ -160,20 +476,28 @@ def plot_trend_bars(df: DataFrame):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def plot_pie(df: DataFrame):
+def plot_pie(totals: DataFrame):
     import plotly.graph_objects as go
 
-    df = df.groupby("category").amount.sum().reset_index(name="amount")
-    values = list(zip(df["amount"].values, df["category"].values))
-    values = sorted(values, reverse=False)
-
-    fig = go.Figure(data=[go.Pie(labels=[k for _,k in values], values=[v for v, _ in values], hole=.3)])
+    fig = go.Figure(
+        data=[
+            go.Pie(
+                labels=totals["category"].to_numpy(),
+                values=totals["amount"].to_numpy(),
+                hole=0.3,
+            )
+        ]
+    )
 
     st.plotly_chart(fig, use_container_width=True)
 
 
-
-def category_inspector_aux(df: DataFrame, title: Literal["expenses", "incomes"]):
+def category_inspector_aux(
+    df: DataFrame,
+    title: Literal["expenses", "incomes"],
+    tag_table: Optional[DataFrame] = None,
+    search: Optional[SearchIndex] = None,
+):
     st.subheader(f"{get_icon(title)} {title.capitalize()}")
 
     selectbox = lambda label, values: st.selectbox(
@@ -184,30 +508,68 @@ def category_inspector_aux(df: DataFrame, title: Literal["expenses", "incomes"])
 
     col1, col2 = st.columns(2)
     with col1:
-        select_month = selectbox("Month", list(df.date.dt.month.unique()))
+        select_month = selectbox("Month", sorted(df.month.unique()))
     with col2:
-        select_year = selectbox("Year", list(df.date.dt.year.unique()))
+        select_year = selectbox("Year", list(df.year.unique()))
+
+    query = st.text_input(
+        "Search",
+        key=f"search_{title}",
+        placeholder="words of the description or #tags, beginnings are enough",
+    )
 
     df_tmp = df
     if select_category != "All":
         df_tmp = df_tmp[df_tmp.category == select_category]
-    if select_year != "All":
-        df_tmp = df_tmp[df_tmp.date.dt.year == select_year]
-    if select_month != "All":
-        df_tmp = df_tmp[df_tmp.date.dt.month == select_month]
+    df_tmp = select_month_year(
+        df_tmp,
+        month=None if select_month == "All" else select_month,
+        year=None if select_year == "All" else select_year,
+    )
+    # the index answers with the labels of the rows, any subset can be filtered
+    if query.strip() and search is not None:
+        df_tmp = df_tmp[df_tmp.index.isin(search.rows(query))]
+
+    # only the requested page is sorted and sent to the browser
+    rows = len(df_tmp)
+    size_col, page_col = st.columns(2)
+    with size_col:
+        page_size = st.selectbox(
+            "Rows per page", _PAGE_SIZES, index=1, key=f"page_size_{title}"
+        )
+    pages = max(1, -(-rows // page_size))
+    page_key = f"page_{title}"
+    # the filters may have shrunk the pages below the selected one
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+    with page_col:
+        page = st.number_input("Page", min_value=1, max_value=pages, key=page_key)
 
-    df_tmp = df_tmp[["date", "category", "amount", "description", "tags"]]
+    df_tmp = page_by_amount(df_tmp, page - 1, page_size)
 
-    plot_dataframe(df_tmp.sort_values(by=["amount"], ascending=False))
+    # compact datasets keep the tags only in the tag table
+    if "tags" not in df_tmp:
+        df_tmp = df_tmp.assign(tags=tag_lists(tag_table, df_tmp))
+
+    columns = ["date", "category", "amount", "description", "tags"]
+    if "owner" in df_tmp:
+        columns.insert(2, "owner")
+
+    plot_dataframe(df_tmp[columns])
+    st.caption(f"{rows} transactions · page {page} of {pages}, largest amounts first")
 
 
 def plot_dataframe(df: DataFrame):
-    df["description"] = df["description"].apply(lambda v : "" if not isinstance(v,str) else v) 
+    # missing descriptions are empty lists (or NA when compact)
+    description = df["description"]
+    is_text = description.map(lambda v: isinstance(v, str)).astype(bool)
+    df = df.assign(description=description.where(is_text, "").astype(object))
     st.dataframe(
         df,
         column_config={
             "date": st.column_config.DatetimeColumn("Date", format="DD/MM/YYYY"),
             "category": "Category",
+            "owner": "Owner",
             "amount": st.column_config.NumberColumn("Amount", format=_AMOUNT_FORMAT),
             "description": "Description",
             "tags": "Tags",
@@ -217,63 +579,22 @@ def plot_dataframe(df: DataFrame):
     )
 
 
-def category_inspector_section(df: DataFrame):
+def category_inspector_section(data: Dataset):
     header("🕵 Category inspector")
 
-    category_inspector_aux(df[~df.expense], "incomes")
-    category_inspector_aux(df[df.expense], "expenses")
-
-
-def select_month_year(
-    df: DataFrame,
-    month: Optional[int] = None,
-    year: Optional[int] = None,
-    same_month: bool = True,
-    same_year: bool = True,
-) -> DataFrame:
-    if month:
-        month_op = "==" if same_month else "!="
-        df = df.query(f"date.dt.month {month_op} {month}")
-
-    if year:
-        year_op = "==" if same_year else "!="
-        df = df.query(f"date.dt.year {year_op} {year}")
-
-    return df
-
-
-def get_sum(df: DataFrame) -> float:
-    return _r(df.amount.sum())
+    # built once per version of the data, the first search of any session
+    # does not wait for it
+    search = data.search
+    category_inspector_aux(data.side(expense=False)[0], "incomes", data.tags, search)
+    category_inspector_aux(data.side(expense=True)[0], "expenses", data.tags, search)
 
 
-def inc_exp(
+def month_overview(
     df_incomes: DataFrame,
     df_expenses: DataFrame,
-    month: Optional[int] = None,
-    year: Optional[int] = None,
-    same_month: bool = True,
-    same_year: bool = True,
-) -> Tuple[DataFrame, DataFrame]:
-    inc = select_month_year(df_incomes, month, year, same_month, same_year)
-    exp = select_month_year(df_expenses, month, year, same_month, same_year)
-    return inc, exp
-
-
-def inc_exp_sum(
-    df_incomes: DataFrame,
-    df_expenses: DataFrame,
-    month: Optional[int] = None,
-    year: Optional[int] = None,
-    same_month: bool = True,
-    same_year: bool = True,
-) -> Tuple[float, float]:
-    inc, exp = inc_exp(df_incomes, df_expenses, month, year, same_month, same_year)
-    inc = get_sum(inc)
-    exp = get_sum(exp)
-    return inc, exp
-
-
-def month_overview(df_incomes: DataFrame, df_expenses: DataFrame):
+    cube: DataFrame,
+    tag_table: Optional[DataFrame] = None,
+):
     header("Month Overview")
 
     curr_month, curr_year = get_curr_month_year()
@@ -287,11 +608,11 @@ def month_overview(df_incomes: DataFrame, df_expenses: DataFrame):
         # year = f"Previous year ({prev_year})"
         year = f"Previous year"
     )
-    
-    df_tmp = pd.concat((df_expenses, df_incomes))
+    compare_keys = dict(zip(compare_options.values(), COMPARISONS))
+
     year_col, month_col, compare_col = st.columns([0.25,0.25,0.5])
     with year_col:
-        years = sorted(list(df_tmp.date.dt.year.unique()))
+        years = sorted(list(cube.year.unique()))
         selected_year = st.selectbox(
             f"Select year",
             years,
@@ -299,7 +620,7 @@ def month_overview(df_incomes: DataFrame, df_expenses: DataFrame):
             key=f"selectbox_year_overview",
         )
     with month_col:
-        months = sorted(list(df_tmp.date.dt.month.unique()))
+        months = sorted(list(cube.month.unique()))
         selected_month = st.selectbox(
             f"Select month",
             [get_month_name(i).capitalize() for i in months],
@@ -313,45 +634,11 @@ def month_overview(df_incomes: DataFrame, df_expenses: DataFrame):
     curr_month = get_month_idx(selected_month.lower())
     curr_year = selected_year
 
-    prev_month, prev_year = get_prev_month_year(curr_month, curr_year)
-
-    curr_incomes, curr_expenses = inc_exp_sum(
-        df_incomes, df_expenses, curr_month, curr_year
+    curr_incomes, curr_expenses = inc_exp_sum(cube, curr_month, curr_year)
+    prev_incomes, prev_expenses = compare_month(
+        cube, curr_month, curr_year, compare_keys[respect_to]
     )
 
-    # compare to the previous month
-    if respect_to == compare_options["month"]:
-        prev_year = prev_year if curr_month == 1 else curr_year
-        prev_incomes, prev_expenses = inc_exp_sum(
-            df_incomes, df_expenses, prev_month, prev_year
-        )
-
-    # compare to the rest of the year
-    elif respect_to == compare_options["year"]:
-        prev_incomes, prev_expenses = inc_exp_sum(
-            df_incomes, df_expenses, curr_month, prev_year
-        )
-
-    # compare to the same month of the previous year
-    else:  # respect_to == compare_options["monthavg"]:
-        df_prev_incomes, df_prev_expenses = inc_exp(
-            df_incomes, df_expenses, curr_month, curr_year, False
-        )
-
-        prev_incomes = prev_expenses = 0.0
-        if not df_prev_incomes.empty:
-            prev_incomes = _r(
-                df_prev_incomes.groupby(by=[df_prev_incomes.date.dt.month])
-                .amount.sum()
-                .values.mean()
-            )
-        if not df_prev_expenses.empty:
-            prev_expenses = _r(
-                df_prev_expenses.groupby(by=[df_prev_expenses.date.dt.month])
-                .amount.sum()
-                .values.mean()
-            )
-
     delta_incomes = delta(curr_incomes, prev_incomes)
     delta_expenses = delta(curr_expenses, prev_expenses)
 
@@ -371,42 +658,22 @@ def month_overview(df_incomes: DataFrame, df_expenses: DataFrame):
     plot_topfive("expenses", select_month_year(df_expenses, curr_month, curr_year))
 
     print_tags(
-        df_incomes[
-            (df_incomes.date.dt.month == curr_month)
-            & (df_incomes.date.dt.year == curr_year)
-        ],
-        df_expenses[
-            (df_expenses.date.dt.month == curr_month)
-            & (df_expenses.date.dt.year == curr_year)
-        ],
+        select_month_year(df_incomes, curr_month, curr_year),
+        select_month_year(df_expenses, curr_month, curr_year),
+        tag_table,
     )
 
 
-def aggregate_tags_values(df: pd.DataFrame) -> pd.DataFrame:
-    tags = list()
-    values = list()
-
-    def _mark_tags(row: pd.Series):
-        row_tags = row.tags
-        for row_tag in row_tags:
-            tags.append(row_tag)
-            values.append(row.amount)
-        return row
-
-    df = df.apply(_mark_tags, axis=1)
-
-    df_summary = (
-        pd.DataFrame({"tag": tags, "values": values})
-        .groupby("tag")
-        .agg(tag=("tag", "first"), value=("values", "sum"))
-    )
+def aggregate_tags_values(
+    df: DataFrame, tag_table: Optional[DataFrame] = None
+) -> DataFrame:
+    df_summary = tag_totals(df, tag_table)
     if not df_summary.empty:
-        df_summary["impact"] = (df_summary.value / df["amount"].sum()) * 100
-        df_summary["tag"] = df_summary["tag"].apply(_tag)
+        df_summary["tag"] = df_summary["tag"].map(_tag)
     return df_summary
 
 
-def plot_tag_df(df: pd.DataFrame):
+def plot_tag_df(df: DataFrame):
     st.dataframe(
         df,
         column_config={
@@ -422,14 +689,17 @@ def plot_tag_df(df: pd.DataFrame):
     )
 
 
-def print_tags(df_incomes: DataFrame, df_expenses: DataFrame):
+def print_tags(
+    df_incomes: DataFrame,
+    df_expenses: DataFrame,
+    tag_table: Optional[DataFrame] = None,
+):
     st.write("**#️⃣  Tags**")
 
     def _print(df: DataFrame, title: Literal["expenses", "incomes"]):
-        # df = df[df.tags.str.len() > 0]
-        tags = aggregate_tags_values(df)
+        tags = aggregate_tags_values(df, tag_table)
         st.write(f"{get_icon(title)} **{title.capitalize()}**")
-        if not df[df.tags.str.len() > 0].empty:
+        if not tags.empty:
             plot_tag_df(tags)
         else:
             st.write(f"*:gray[No {title} tags yet]*")
@@ -443,17 +713,82 @@ def print_tags(df_incomes: DataFrame, df_expenses: DataFrame):
         _print(df_expenses, "expenses")
 
 
-def overall_overview(
-    df_incomes: DataFrame,
-    df_expenses: DataFrame,
-):
+def overall_overview(monthly: DataFrame, shares: Dict[str, DataFrame]):
+    """Overall overview section, whole-history analytics of the monthly totals"""
+
+    import plotly.express as px
+
     header("Overall Overview")
-    
+
+    if monthly.empty:
+        st.write("*:gray[No data yet]*")
+        return
+
+    last = monthly.iloc[-1]
+    last_year = monthly.iloc[-12:]
+    incomes = last_year["incomes"].sum()
+    savings_rate = last_year["net"].sum() / incomes * 100 if incomes else None
+
+    _, balance, rate, exp, inc, _ = st.columns(6)
+    with balance:
+        st.metric(label="**Balance**", value=_r(last["balance"]))
+    with rate:
+        st.metric(
+            label="**Savings rate (12 months)**",
+            value="-" if savings_rate is None else f"{savings_rate:.1f} %",
+        )
+    with exp:
+        st.metric(
+            label="**:red[Expenses (12 months avg)]**", value=_r(last["expenses_12m"])
+        )
+    with inc:
+        st.metric(
+            label="**:green[Incomes (12 months avg)]**", value=_r(last["incomes_12m"])
+        )
+
+    fig = px.line(monthly, x="date", y="balance", title="Cumulative balance")
+    st.plotly_chart(fig, use_container_width=True)
+
+    window = st.radio(
+        "Rolling average",
+        ROLLING_WINDOWS,
+        format_func=lambda w: f"{w} months",
+        key="overall_window",
+        horizontal=True,
+    )
+    averages = monthly[["date", f"incomes_{window}m", f"expenses_{window}m"]].set_axis(
+        ["date", "income", "expense"], axis=1
+    )
+    fig = px.line(
+        averages,
+        x="date",
+        y=["income", "expense"],
+        color_discrete_map={"expense": "red", "income": "green"},
+        title=f"Incomes and expenses, {window} months average",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    fig = px.bar(monthly, x="date", y="savings_rate", title="Savings rate (%)")
+    st.plotly_chart(fig, use_container_width=True)
+
+    title = st.radio(
+        "Category share of", ["expenses", "incomes"], key="overall_share", horizontal=True
+    )
+    fig = px.area(
+        shares[title],
+        x="date",
+        y="share",
+        color="category",
+        title=f"{get_icon(title)} Share of the {title} by category (%)",
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
 
 def year_overview(
     df_incomes: DataFrame,
     df_expenses: DataFrame,
+    cube: DataFrame,
+    tag_table: Optional[DataFrame] = None,
 ):
     """Year overview section"""
 
@@ -466,18 +801,10 @@ def year_overview(
 
     on = st.toggle("Include current month", key="include_curr_month")
 
-    if on:
-        gbl_curr_incomes, gbl_curr_expenses = inc_exp_sum(
-            df_incomes, df_expenses, year=curr_year
-        )
-    else:
-        gbl_curr_incomes, gbl_curr_expenses = inc_exp_sum(
-            df_incomes, df_expenses, curr_month, curr_year, False
-        )
-
-    gbl_prev_incomes, gbl_prev_expenses = inc_exp_sum(
-        df_incomes, df_expenses, year=prev_year
+    gbl_curr_incomes, gbl_curr_expenses = year_totals(
+        cube, curr_year, exclude_month=None if on else curr_month
     )
+    gbl_prev_incomes, gbl_prev_expenses = year_totals(cube, prev_year)
 
     gbl_delta_incomes = delta(gbl_curr_incomes, gbl_prev_incomes)
     gbl_delta_expenses = delta(gbl_curr_expenses, gbl_prev_expenses)
@@ -496,17 +823,7 @@ def year_overview(
             label="**:green[Incomes]**", value=gbl_curr_incomes, delta=gbl_delta_incomes
         )
 
-    df = pd.concat([df_incomes, df_expenses])
-    df_tmp = (
-        df[df.date.dt.year == curr_year]
-        .groupby(by=[df.date.dt.month, df.expense])
-        .amount.sum()
-        .reset_index(name="amount")
-    )
-
-    df_tmp["expense"] = df_tmp["expense"].apply(lambda v: "expense" if v else "income")
-
-    df_tmp = df_tmp.groupby(["date", "expense"]).amount.sum().reset_index(name="amount")
+    df_tmp = year_trend(cube, curr_year)
 
     on = st.toggle("Log scale", key="plot_summary_year")
     fig = px.line(
@@ -523,25 +840,31 @@ def year_overview(
 
     st.plotly_chart(fig, use_container_width=True)
     print_tags(
-        df_incomes[df_incomes.date.dt.year == curr_year],
-        df_expenses[df_expenses.date.dt.year == curr_year],
+        select_month_year(df_incomes, year=curr_year),
+        select_month_year(df_expenses, year=curr_year),
+        tag_table,
     )
 
 
-def overview_section(df: DataFrame):
+def overview_section(data: Dataset):
     """Month end year overview"""
 
-    df_incomes = df[~df.expense]
-    df_expenses = df[df.expense]
+    df = data.transactions
+    df_incomes, _ = data.side(expense=False)
+    df_expenses, _ = data.side(expense=True)
 
     with st.container(border=True):
         month, year, overall = st.tabs(["Month", "Year", "Overall"])
-        with month:
-            month_overview(df_incomes, df_expenses)
-        with year:
-            year_overview(df_incomes, df_expenses)
-        with overall:
-            overall_overview(df_incomes, df_expenses)
+        with month, stage("month_overview", len(df)):
+            month_overview(df_incomes, df_expenses, data.cube, data.tags)
+        with year, stage("year_overview", len(df)):
+            year_overview(df_incomes, df_expenses, data.cube, data.tags)
+        with overall, stage("overall_overview", len(df)):
+            # computed once per dataset, a few hundred months whatever the rows
+            monthly, shares = data.memo.get_or_compute(
+                ("overall",), lambda: overall_frames(data.cube)
+            )
+            overall_overview(monthly, shares)
 
 
 def plot_topfive(title: str, df: DataFrame):
@@ -550,17 +873,15 @@ def plot_topfive(title: str, df: DataFrame):
     if len(df) == 0:
         st.write(f"*:gray[No data for this period]*")
     else:
-        df_tmp = df[["date", "category", "amount", "description"]]
+        plot_dataframe(top_five(df))
 
-        plot_dataframe(df_tmp.sort_values(by=["amount"], ascending=False).head(5))
 
-
-def incomes_expenses_section(df: DataFrame, title: str):
+def incomes_expenses_section(data: Dataset, title: str):
     """Incomes and expenses section"""
 
     is_expenses = title == "expenses"
 
-    df = df.query(f"expense == {is_expenses}")
+    df, tag_table = data.side(is_expenses)
 
     header(f"{get_icon(title)} {title.capitalize()}")
 
@@ -573,9 +894,7 @@ def incomes_expenses_section(df: DataFrame, title: str):
         with col2:
             option = st.selectbox(
                 f"Select {genre}",
-                df.date.dt.year.unique()
-                if genre == "Year"
-                else df.date.dt.month.unique(),
+                df.year.unique() if genre == "Year" else sorted(df.month.unique()),
                 key=f"selectbox_{title}",
             )
 
@@ -587,7 +906,7 @@ def incomes_expenses_section(df: DataFrame, title: str):
 
     multiselect_tags = lambda t: st.multiselect(
         "Don't consider these tags",
-        list(set([_tag(tag) for tags in list(df.tags) for tag in tags])),
+        [_tag(tag) for tag in tag_table.tag.unique().sort_values()],
         key=f"dont_{str(is_expenses)}_{t}",
     )
 
@@ -597,54 +916,142 @@ def incomes_expenses_section(df: DataFrame, title: str):
     with accounts_col:
         dont_consider_accounts = multiselect("account")
 
-    ignored_tags = multiselect_tags("tags")
-
-    time_period_condition = df.date.dt.year if genre == "Year" else df.date.dt.month
-
-    df_tmp = df[
-        (time_period_condition == option)
-        & ~df.account.isin(dont_consider_accounts)
-        & ~df.category.isin(dont_consider_categories)
-    ]
+    # household datasets can be filtered and split by owner
+    household = "owner" in df
+    if household:
+        owners_col, split_col = st.columns(2)
+        with owners_col:
+            dont_consider_owners = multiselect("owner")
+        with split_col:
+            split = st.toggle("Split by owner", key=f"split_{title}")
 
-    # remove tags
-    if ignored_tags:
-        ignored_tags = [_untag(tag) for tag in ignored_tags]
-        df_tmp = df_tmp[
-            ~df_tmp.tags.apply(
-                lambda t: len(set(t).intersection(set(ignored_tags))) > 0
-            )
-        ]
-
-    temporal_period = df_tmp.date.dt.year if genre == "Month" else df_tmp.date.dt.month
+    ignored_tags = multiselect_tags("tags")
 
-    df_tmp = get_trend(
-        df=df_tmp, temporal_period=temporal_period, categories=df.category
+    # the frames of a filter state are memoized on the dataset, flipping back
+    # to a previous combination does not recompute them
+    state = (
+        title,
+        genre,
+        option,
+        frozenset(dont_consider_categories),
+        frozenset(dont_consider_accounts),
+        frozenset(dont_consider_owners) if household else None,
+        frozenset(_untag(tag) for tag in ignored_tags),
+        household and split,
+    )
+    trend, totals = data.memo.get_or_compute(
+        state, lambda: trend_frames(df, tag_table, *state[1:])
     )
 
-    plot_trend_line(df_tmp, title)
+    plot_trend_line(trend, title)
 
     bars, pie = st.columns(2)
     with bars:
-        plot_trend_bars(df_tmp)
+        plot_trend_bars(totals)
     with pie:
-        plot_pie(df_tmp)
+        plot_pie(totals)
+
+
+@st.fragment
+def fragment(
+    name: str,
+    section: Callable[..., None],
+    worker: Refresher,
+    owners: Optional[Sequence[str]],
+    *args,
+):
+    """Run a section as a fragment, a change of one of its widgets reruns only
+    the section, on the latest snapshot of the data. A fragment rerun is
+    profiled and logged on its own"""
+    try:
+        # read at every run, a fragment rerun does not go through body()
+        data = select_owners(worker.snapshot().data, owners)
+    except Exception as exc:
+        st.error(f"⚠️ {error_message(exc)}")
+        return
+
+    enabled = st.session_state.get("perf_enabled", False)
+    with profiling.profiled(enabled, get_perf_log_path()):
+        with stage(name, len(data.transactions)):
+            section(data, *args)
 
 
 def body():
     """Display the entire webapp"""
-    with st.spinner("Downloading data..."):
-        df = load_dataframe(st.session_state.url)
+    ttl, refresh = cache_controls()
+    incremental, resync = sync_controls()
+    compact = st.sidebar.toggle("Compact memory mode", key="compact_mode")
+    streaming = st.sidebar.toggle(
+        "Streaming ingestion",
+        key="streaming_mode",
+        help="Read large sheets in chunks, lower peak memory",
+    )
+    profiler = profiling.start(st.sidebar.toggle("Performance", key="perf_enabled"))
+    fx_info()
+
+    url = st.session_state.url
+    sheets = st.session_state.get("sheets")
+    urls = sheets or {None: url}
 
-    if df is not None:
-        df = load_data(df)
-        overview_section(df)
+    # one worker per source and loading options, shared by the sessions
+    load = lambda refresh: load_source(
+        url, sheets, ttl, refresh, incremental, streaming, compact
+    )
+    worker = _refreshers.get(
+        (frozenset(urls.items()), incremental, streaming, compact), load, ttl or None
+    )
+    if resync:
+        # without a stored copy the incremental sync downloads the whole sheet
+        for owner, sheet_url in urls.items():
+            try:
+                extract_sheet_id(sheet_url)
+            except InvalidSheetUrl:
+                # never downloaded, nothing to invalidate
+                continue
+            _sheet_cache.invalidate(sheet_key(sheet_url, streaming, owner))
+
+    data = None
+    try:
+        if not worker.ready:
+            with st.spinner("Downloading data..."):
+                worker.snapshot()
+        elif refresh or resync:
+            with st.spinner("Refreshing data..."):
+                worker.refresh_now()
+        snapshot = worker.snapshot()
+    except Exception as exc:
+        if isinstance(exc, NoSheetLoaded):
+            for owner, sheet_exc in exc.errors.items():
+                st.warning(f"⚠️ Sheet of **{owner}** not loaded. {error_message(sheet_exc)}")
+        error_page(error_message(exc))
+    else:
+        data = snapshot.data
+        refresh_info(worker, snapshot)
+        if not sheets:
+            cache_info(url)
+        # plain transactions of the same version, from the cache
+        plain = lambda: load_source(
+            url, sheets, math.inf, False, incremental, streaming
+        )[0].transactions
+        debug_panel(data, plain)
+
+    if data is not None:
+        owners = owner_filter(data)
+        fragment("overview_section", overview_section, worker, owners)
         with st.container(border=True):
-            incomes_expenses_section(df, "expenses")
+            fragment(
+                "expenses_section", incomes_expenses_section, worker, owners, "expenses"
+            )
         with st.container(border=True):
-            incomes_expenses_section(df, "incomes")
+            fragment(
+                "incomes_section", incomes_expenses_section, worker, owners, "incomes"
+            )
         with st.container(border=True):
-            category_inspector_section(df)
+            fragment(
+                "category_inspector_section", category_inspector_section, worker, owners
+            )
+
+    performance_panel(profiler)
 
 
 def page_config():
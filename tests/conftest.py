@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+# the app modules import each other as top-level modules (see src/local.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utility.fake_sheet_server import FakeSheetServer  # noqa: E402
+
+
+@pytest.fixture
+def sheets() -> Dict[str, str]:
+    """CSV text of the sheets served by ``server``, by sheet id. Overridden by
+    a module fixture or ``@pytest.mark.parametrize("sheets", ...)``"""
+    return {}
+
+
+@pytest.fixture
+def server(sheets, monkeypatch):
+    """Local gviz endpoint serving ``sheets``, the app downloads from it"""
+    with FakeSheetServer(sheets) as server:
+        monkeypatch.setenv("TELEXPENSE_VIZ_GVIZ_URL", server.url)
+        yield server
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from utility.artificial_data import COLUMNS, generate, main
+from visualizer import load_data
+
+
+def test_generate_is_seeded():
+    first = generate(2_000, "2020-01-01", "2021-12-31", seed=7)
+    second = generate(2_000, "2020-01-01", "2021-12-31", seed=7)
+
+    assert list(first.columns) == COLUMNS
+    assert len(first) == 2_000
+    pd.testing.assert_frame_equal(first, second)
+    assert not first.equals(generate(2_000, "2020-01-01", "2021-12-31", seed=8))
+
+
+def test_generate_layout():
+    sheet = generate(5_000, "2020-01-01", "2021-12-31", seed=1)
+    transfers = sheet[sheet.Category == "Transfer"]
+
+    assert 0 < len(transfers) and len(transfers) % 2 == 0
+    assert sheet.Description.isna().any()
+    assert sheet.Amount.str.contains(",").all()
+    assert sheet.Description.str.count("#").max() > 1
+
+    df = load_data(sheet)
+    assert len(df) == len(sheet) - len(transfers)
+    assert df.date.min() >= pd.Timestamp("2020-01-01")
+    assert df.date.max() <= pd.Timestamp("2021-12-31")
+    assert df.expense.any() and (~df.expense).any()
+    assert df.tags.str.len().sum() > 0
+
+
+def test_cli(tmp_path):
+    for name in ("sheet.csv", "sheet.parquet"):
+        main(["--rows", "300", "--seed", "2", "--out", str(tmp_path / name)])
+
+    csv = pd.read_csv(tmp_path / "sheet.csv")
+    parquet = pd.read_parquet(tmp_path / "sheet.parquet")
+    assert len(csv) == len(parquet) == 300
+    assert list(csv.columns) == list(parquet.columns) == COLUMNS
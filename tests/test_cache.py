@@ -0,0 +1,190 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from cache import SheetCache, nbytes
+from dataset import Dataset
+from engine import load_data, tag_totals, trend_frames
+from fetch import FetchError
+from sync import download_sheet
+from utility.artificial_data import generate
+from visualizer import shared_dataset
+
+_CSV = """Date,Description,Category,Amount,Account,In main currency
+15/01/2024,Pizza #friends,Food,"-12,5",Cash,"-12,5"
+16/01/2024,,Salary,1000,HSBC,1000
+"""
+
+
+@pytest.fixture
+def sheets():
+    return {"sheet1": _CSV}
+
+
+def test_hit_skips_download(server, tmp_path):
+    cache = SheetCache(tmp_path)
+    fetch = lambda: download_sheet("sheet1")
+
+    first = cache.get_or_fetch("sheet1", fetch)
+    second = cache.get_or_fetch("sheet1", fetch)
+
+    assert server.requests == 1
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_disk_tier_survives_memory(server, tmp_path):
+    fetch = lambda: download_sheet("sheet1")
+    df = SheetCache(tmp_path).get_or_fetch("sheet1", fetch)
+
+    cache = SheetCache(tmp_path)
+    cached = cache.get_or_fetch("sheet1", fetch)
+
+    assert server.requests == 1
+    assert cache.hits == 1
+    pd.testing.assert_frame_equal(df.fillna(""), cached.fillna(""))
+
+
+def test_ttl_and_refresh(server, tmp_path):
+    cache = SheetCache(tmp_path)
+    fetch = lambda: download_sheet("sheet1")
+
+    cache.get_or_fetch("sheet1", fetch)
+    cache.get_or_fetch("sheet1", fetch, ttl=0)
+    assert server.requests == 2
+
+    cache.get_or_fetch("sheet1", fetch, refresh=True)
+    assert server.requests == 3
+    assert cache.age("sheet1") < 60
+
+
+def test_missing_sheet(server, tmp_path):
+    cache = SheetCache(tmp_path)
+    with pytest.raises(FetchError):
+        cache.get_or_fetch("unknown", lambda: download_sheet("unknown"))
+    assert cache.get("unknown") is None
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"amount": range(rows)}, dtype="float64")
+
+
+def test_lru_bounded_by_bytes(tmp_path):
+    size = _frame(1000).memory_usage(deep=True).sum()
+    evicted = []
+    cache = SheetCache(
+        tmp_path, max_bytes=int(2.5 * size), on_evict=lambda *entry: evicted.append(entry)
+    )
+
+    for key in "abc":
+        cache.put(key, _frame(1000), persist=False)
+        cache.get("a")  # keep the first one recently used
+
+    assert cache.evictions == 1
+    assert [key for key, _ in evicted] == ["b"]
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size <= cache.max_bytes
+
+
+def test_dataset_size_counts_derived(tmp_path):
+    data = Dataset.from_transactions(load_data(generate(2_000, seed=2)))
+    cache = SheetCache(tmp_path)
+    cache.put("data", data, persist=False)
+    before = cache.size
+
+    # built on the cached dataset by the sessions
+    data.side(True)
+    data.search.rows("pizza")
+    data.memo.get_or_compute("frame", lambda: _frame(10_000))
+    grown = nbytes(data)
+    assert grown > before + _frame(10_000).memory_usage(deep=True).sum()
+
+    # measured again when an entry is added
+    cache.put("other", _frame(10), persist=False)
+    assert cache.size == grown + nbytes(_frame(10))
+
+
+def test_single_flight(tmp_path):
+    cache = SheetCache(tmp_path)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return _frame(10)
+
+    with ThreadPoolExecutor(8) as pool:
+        frames = list(pool.map(lambda _: cache.get_or_fetch("k", fetch), range(8)))
+
+    assert len(calls) == 1
+    assert all(df is frames[0] for df in frames)
+    assert (cache.misses, cache.hits) == (1, 7)
+    assert cache.coalesced >= 1
+
+
+def test_single_flight_error(tmp_path):
+    cache = SheetCache(tmp_path)
+
+    def fetch():
+        time.sleep(0.1)
+        raise ValueError("down")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_fetch, "k", fetch) for _ in range(4)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+    # the failure is not cached
+    assert cache.get_or_fetch("k", lambda: _frame(1)).shape == (1, 1)
+
+
+def test_shared_dataset_versioned(tmp_path, monkeypatch):
+    cache = SheetCache(tmp_path)
+    monkeypatch.setattr("visualizer._sheet_cache", cache)
+    builds = []
+    build = lambda: builds.append(1) or len(builds)
+
+    cache.put("alice", _frame(1), persist=False)
+    cache.put("bob", _frame(1), persist=False)
+    assert shared_dataset(["alice"], False, build) == 1
+    # same sheets in any order, other sessions get the same dataset
+    assert shared_dataset(["alice"], False, build) == 1
+    assert shared_dataset(["bob", "alice"], False, build) == 2
+    assert shared_dataset(["alice", "bob"], False, build) == 2
+    assert shared_dataset(["alice"], True, build) == 3
+
+    time.sleep(0.01)
+    cache.put("alice", _frame(2), persist=False)
+    assert shared_dataset(["alice"], False, build) == 4
+
+
+def test_shared_dataset_concurrent_reads():
+    # the frames of a dataset are read by the threads of all the sessions,
+    # lazily built pandas state must not be raced on
+    sheet = load_data(generate(100_000, seed=1, tagged_share=0.9))
+    interval = sys.getswitchinterval()
+    # switch threads as often as possible, the race shows at every run
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(5):
+            data = Dataset.from_transactions(sheet.copy())
+            expenses, tag_table = data.side(True)
+            year = int(expenses.year.iloc[-1])
+            start = threading.Barrier(8)
+
+            def read(_):
+                start.wait()
+                trend, _ = trend_frames(expenses, tag_table, "Year", year)
+                return trend.amount.sum(), tag_totals(expenses, tag_table).value.sum()
+
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(read, range(8)))
+            assert len(set(results)) == 1
+    finally:
+        sys.setswitchinterval(interval)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import Dataset, build_cube, compact_transactions, tag_lists
+from engine import inc_exp_monthly_avg, inc_exp_sum, load_data, select_month_year
+from visualizer import aggregate_tags_values
+
+
+@pytest.fixture
+def transactions() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    rows = 500
+    dates = pd.Series(
+        pd.Timestamp("2022-01-01")
+        + pd.to_timedelta(np.sort(rng.integers(0, 3 * 365, rows)), unit="D")
+    )
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "category": rng.choice(["Food", "Home", "Salary"], rows),
+            "amount": np.round(rng.uniform(1, 100, rows), 2),
+            "account": rng.choice(["Cash", "HSBC"], rows),
+            "expense": rng.random(rows) < 0.8,
+            "year": dates.dt.year,
+            "month": dates.dt.month,
+        }
+    )
+
+
+def _sums(df: pd.DataFrame, mask: pd.Series):
+    df = df[mask]
+    return round(df[~df.expense].amount.sum(), 2), round(df[df.expense].amount.sum(), 2)
+
+
+def test_cube_totals(transactions):
+    cube = build_cube(transactions)
+    df = transactions
+    month, year = df.date.dt.month, df.date.dt.year
+
+    assert cube["count"].sum() == len(df)
+    assert inc_exp_sum(cube, 3, 2023) == _sums(df, (month == 3) & (year == 2023))
+    assert inc_exp_sum(cube, year=2022) == _sums(df, year == 2022)
+    assert inc_exp_sum(cube, 3, 2023, False) == _sums(df, (month != 3) & (year == 2023))
+    assert inc_exp_sum(cube, 3, 2023, True, False) == _sums(df, (month == 3) & (year != 2023))
+    assert inc_exp_sum(cube, 1, 1990) == (0.0, 0.0)
+
+
+def test_cube_monthly_average(transactions):
+    cube = build_cube(transactions)
+    df = transactions[
+        (transactions.date.dt.year == 2023) & (transactions.date.dt.month != 5)
+    ]
+    monthly = df.groupby([df.expense, df.date.dt.month]).amount.sum()
+
+    assert inc_exp_monthly_avg(cube, 5, 2023) == (
+        round(monthly[False].mean(), 2),
+        round(monthly[True].mean(), 2),
+    )
+
+
+@pytest.mark.parametrize(
+    "month, year, same_month, same_year",
+    [
+        (3, 2023, True, True),
+        (3, None, True, True),
+        (None, 2022, True, True),
+        (3, 2023, False, True),
+        (3, 2023, True, False),
+        (3, 2023, False, False),
+        (12, None, False, True),
+        (None, 1990, True, True),
+        (None, None, True, True),
+    ],
+)
+def test_select_month_year(transactions, month, year, same_month, same_year):
+    df = transactions[transactions.expense]
+    mask = pd.Series(True, index=df.index)
+    if month:
+        mask &= (df.date.dt.month == month) == same_month
+    if year:
+        mask &= (df.date.dt.year == year) == same_year
+
+    pd.testing.assert_frame_equal(
+        select_month_year(df, month, year, same_month, same_year), df[mask]
+    )
+
+
+def test_compact_dataset():
+    sheet = pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "01/02/2024", "03/02/2024"],
+            "Description": ["Pizza #food #friends", np.nan, "Rent", "Cinema #friends"],
+            "Category": ["Food", "Salary", "Home", "Fun"],
+            "Amount": ["-12,5", "1000", "-300", "-7,25"],
+            "Account": ["Cash", "HSBC", "HSBC", "Cash"],
+        }
+    )
+    plain = Dataset.from_transactions(load_data(sheet))
+    compact = Dataset.from_transactions(load_data(sheet), compact=True)
+    df = compact.transactions
+
+    assert "tags" not in df
+    assert df.category.dtype == "category" and df.account.dtype == "category"
+    assert df.description.dtype == "string[pyarrow]"
+    assert df.description.isna().sum() == 1
+    assert df.month.dtype == np.int8 and df.amount.dtype == np.float64
+
+    assert list(tag_lists(compact.tags, df)) == list(plain.transactions.tags)
+    assert inc_exp_sum(compact.cube, 1, 2024) == inc_exp_sum(plain.cube, 1, 2024)
+    pd.testing.assert_frame_equal(
+        aggregate_tags_values(df, compact.tags),
+        aggregate_tags_values(plain.transactions, plain.tags),
+    )
+    pd.testing.assert_frame_equal(
+        select_month_year(df, 2, 2024).reset_index(drop=True),
+        compact_transactions(select_month_year(plain.transactions, 2, 2024)).reset_index(
+            drop=True
+        ),
+        check_categorical=False,
+    )
+
+
+def test_side_memoized():
+    sheet = pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "03/02/2024"],
+            "Description": ["Pizza #food", np.nan, "Cinema #friends"],
+            "Category": ["Food", "Salary", "Fun"],
+            "Amount": ["-12,5", "1000", "-7,25"],
+            "Account": ["Cash", "HSBC", "Cash"],
+        }
+    )
+    data = Dataset.from_transactions(load_data(sheet))
+    expenses, tags = data.side(expense=True)
+
+    assert list(expenses.amount) == [12.5, 7.25]
+    assert sorted(tags.tag) == ["food", "friends"]
+    assert list(data.side(expense=False)[0].amount) == [1000.0]
+    # split once, the fragments rerun on the same frames
+    assert data.side(expense=True)[0] is expenses
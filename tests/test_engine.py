@@ -0,0 +1,131 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from engine import (category_shares, compare_month, load_dataset, month_report,
+                    monthly_totals, periods, year_report)
+from report import main, render_all
+
+_SHEET = """Date,Description,Category,Amount,Account,In main currency
+15/12/2023,Gift #family,Gifts,-50,Cash,-50
+15/01/2024,Pizza #friends,Food,"-12,5",Cash,"-12,5"
+20/01/2024,Train,Transportation,-30,HSBC,-30
+01/02/2024,,Salary,1000,HSBC,1000
+10/02/2024,Cinema #friends,Fun,-20,Cash,-20
+10/02/2024,Move,Transfer,-100,Cash,-100
+"""
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+@pytest.fixture
+def sheet(tmp_path) -> Path:
+    path = tmp_path / "sheet.csv"
+    path.write_text(_SHEET)
+    return path
+
+
+@pytest.fixture
+def data(sheet):
+    import pandas as pd
+
+    return load_dataset(pd.read_csv(sheet, dtype=str))
+
+
+def test_engine_without_streamlit():
+    script = "import engine, report, sys; print(*sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=SRC, capture_output=True, text=True, check=True
+    )
+    assert "streamlit" not in result.stdout.split()
+
+
+def test_compare_month(data):
+    assert compare_month(data.cube, 2, 2024, "month") == (0.0, 42.5)
+    assert compare_month(data.cube, 1, 2024, "month") == (0.0, 50.0)
+    assert compare_month(data.cube, 2, 2024, "monthavg") == (0.0, 42.5)
+    assert compare_month(data.cube, 1, 2024, "year") == (0.0, 0.0)
+    with pytest.raises(ValueError):
+        compare_month(data.cube, 1, 2024, "week")
+
+
+def test_month_report(data):
+    assert periods(data) == [(2023, 12), (2024, 1), (2024, 2)]
+
+    report = month_report(data, 2024, 2)
+
+    assert report["totals"] == {"incomes": 1000.0, "expenses": 20.0}
+    assert report["deltas"]["month"] == {"incomes": 1000.0, "expenses": -22.5}
+    assert [row["category"] for row in report["expenses"]["top"]] == ["Fun"]
+    assert report["expenses"]["tags"] == [{"tag": "friends", "value": 20.0, "impact": 100.0}]
+    # the report is plain JSON
+    assert json.loads(json.dumps(report)) == report
+
+
+def test_year_report(data):
+    report = year_report(data, 2024)
+
+    assert report["totals"] == {"incomes": 1000.0, "expenses": 62.5}
+    assert report["deltas"]["year"] == {"incomes": 1000.0, "expenses": 12.5}
+    assert report["trend"] == [
+        {"date": 1, "expense": "expense", "amount": 42.5},
+        {"date": 2, "expense": "income", "amount": 1000.0},
+        {"date": 2, "expense": "expense", "amount": 20.0},
+    ]
+
+
+def test_monthly_totals(data):
+    monthly = monthly_totals(data.cube)
+
+    assert list(monthly.date.dt.strftime("%Y-%m")) == ["2023-12", "2024-01", "2024-02"]
+    assert list(monthly.expenses) == [50.0, 42.5, 20.0]
+    assert list(monthly.balance) == [-50.0, -92.5, 887.5]
+    assert list(monthly.expenses_3m) == [50.0, 46.25, 37.5]
+    assert monthly.savings_rate.isna().tolist() == [True, True, False]
+    assert monthly.savings_rate.iloc[-1] == 98.0
+
+
+def test_monthly_totals_gaps(data):
+    # months without transactions are zeros, the rolling means span them
+    cube = data.cube[data.cube.month != 1]
+    monthly = monthly_totals(cube)
+
+    assert len(monthly) == 3
+    assert list(monthly.expenses) == [50.0, 0.0, 20.0]
+    assert list(monthly.expenses_12m) == [50.0, 25.0, 70 / 3]
+    assert monthly_totals(cube.iloc[:0]).empty
+
+
+def test_category_shares(data):
+    shares = category_shares(data.cube, expense=True)
+    january = shares[shares.date == "2024-01-01"].set_index("category")
+
+    assert list(january.index) == ["Food", "Fun", "Gifts", "Transportation"]
+    assert list(january.amount) == [12.5, 0.0, 0.0, 30.0]
+    assert january.share.sum() == pytest.approx(100)
+    assert january.share["Food"] == pytest.approx(12.5 / 42.5 * 100)
+
+
+def test_render_all_pool(data, tmp_path):
+    serial = render_all(data, tmp_path / "serial", workers=1)
+    pooled = render_all(data, tmp_path / "pooled", workers=2)
+
+    assert serial == pooled
+    assert list(serial) == ["2023", "2024", "2023-12", "2024-01", "2024-02"]
+    for files in serial.values():
+        for name in files:
+            assert (tmp_path / "serial" / name).read_text() == (
+                tmp_path / "pooled" / name
+            ).read_text()
+
+
+def test_report_cli(sheet, tmp_path):
+    out = tmp_path / "reports"
+    main(["--csv", str(sheet), "--out", str(out), "--format", "json", "--workers", "1"])
+
+    index = json.loads((out / "index.json").read_text())
+    assert index["2024-01"] == ["2024-01.json"]
+    assert json.loads((out / "2024-01.json").read_text())["totals"]["expenses"] == 42.5
@@ -0,0 +1,114 @@
+import time
+
+import pandas as pd
+import pytest
+
+from engine import load_data
+from fetch import Client, FetchError
+from ingest import read_transactions
+from utility.fake_sheet_server import FakeSheetServer
+from visualizer import error_message
+
+_CSV = "Date,Description,Category,Amount,Account,In main currency\n" + "".join(
+    f'{day % 28 + 1:02d}/01/2024,Pizza #friends,Food,"-{day},5",Cash,"-{day},5"\n'
+    for day in range(500)
+)
+
+
+@pytest.fixture
+def sheets():
+    return {"sheet1": _CSV}
+
+
+@pytest.fixture
+def client() -> Client:
+    return Client(read_timeout=2, retries=3, backoff=0.01)
+
+
+def _url(server: FakeSheetServer, sheet_id: str = "sheet1") -> str:
+    return f"{server.url}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet=Transactions"
+
+
+def test_gzip_and_metrics(server, client):
+    df = client.read_csv(_url(server), dtype=str)
+
+    assert len(df) == 500
+    download = client.last("sheet1")
+    assert download.status == 200
+    assert download.encoding == "gzip"
+    assert download.bytes == len(_CSV)
+    assert download.wire_bytes == server.bytes_sent < len(_CSV) / 4
+    assert 0 < download.latency <= download.seconds
+    assert download.retries == 0
+
+
+def test_connections_reused(server, client):
+    for _ in range(3):
+        client.read_csv(_url(server))
+
+    assert server.connections == 1
+    assert client.requests == 3
+
+
+def test_retry_on_server_errors(server, client):
+    server.failures = [503, 429, 500]
+
+    df = client.read_csv(_url(server), dtype=str)
+
+    assert len(df) == 500
+    assert server.requests == 4
+    assert client.last().retries == 3
+    assert client.retries == 3
+
+
+def test_retry_after_bounded(server):
+    server.failures = [503, 429]
+    server.retry_after = 3600
+    client = Client(retries=3, backoff=0.01, backoff_max=1)
+
+    start = time.perf_counter()
+    df = client.read_csv(_url(server), dtype=str)
+
+    assert len(df) == 500
+    assert client.last().retries == 2
+    # the waits are capped to backoff_max, not the hour asked for
+    assert time.perf_counter() - start < 5
+
+
+def test_retries_exhausted(server, client):
+    server.failures = [503] * 10
+
+    with pytest.raises(FetchError) as info:
+        client.read_csv(_url(server))
+    assert info.value.status == 503
+    assert server.requests == 4
+    assert client.failures == 1
+    assert "try again later" in error_message(info.value)
+
+
+def test_missing_sheet_not_retried(server, client):
+    with pytest.raises(FetchError) as info:
+        client.read_csv(_url(server, "unknown"))
+    assert info.value.status == 404
+    assert server.requests == 1
+    assert "shared" in error_message(info.value)
+
+
+def test_read_timeout(server):
+    server.delay = 0.5
+    client = Client(read_timeout=0.1, retries=1, backoff=0.01)
+
+    with pytest.raises(FetchError) as info:
+        client.read_csv(_url(server))
+    assert info.value.status is None
+    assert server.requests == 2
+    assert "could not be reached" in error_message(info.value)
+
+
+def test_streamed_ingestion(server, client):
+    with client.open_csv(_url(server)) as body:
+        streamed = read_transactions(body, load_data, chunksize=64)
+
+    pd.testing.assert_frame_equal(
+        streamed, load_data(client.read_csv(_url(server), dtype=str))
+    )
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from dataset import Dataset
+from sync import fetch_concurrently
+from utils import format_sheets, parse_sheets
+from visualizer import NoSheetLoaded, load_household
+
+_HEADER = "Date,Description,Category,Amount,Account,In main currency\n"
+_ALICE = _HEADER + """15/01/2024,Pizza #friends,Food,"-12,5",Cash,"-12,5"
+01/02/2024,,Salary,1000,HSBC,1000
+"""
+_BOB = _HEADER + """20/01/2024,Train #work,Transportation,-30,Revolut,-30
+"""
+
+
+@pytest.fixture
+def sheets():
+    return {"alice1": _ALICE, "bob1": _BOB}
+
+
+def _url(sheet_id: str) -> str:
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/edit"
+
+
+def test_parse_sheets():
+    text = "alice\thttps://a/edit\n\nbob smith   https://b/edit\nbroken\n"
+    sheets = parse_sheets(text)
+
+    assert sheets == {"alice": "https://a/edit", "bob smith": "https://b/edit"}
+    assert parse_sheets(format_sheets(sheets)) == sheets
+
+
+def test_fetch_concurrently():
+    def load(owner: str, url: str):
+        time.sleep(0.3)
+        if owner == "bob":
+            raise ValueError(url)
+        return owner
+
+    start = time.perf_counter()
+    frames, errors = fetch_concurrently({"alice": "a", "bob": "b", "carol": "c"}, load)
+
+    assert time.perf_counter() - start < 0.6
+    assert frames == {"alice": "alice", "carol": "carol"}
+    assert list(errors) == ["bob"]
+
+
+def test_load_household(server, tmp_path, monkeypatch):
+    monkeypatch.setattr("visualizer._sheet_cache.path", tmp_path)
+    sheets = {"alice": _url("alice1"), "bob": _url("bob1"), "carol": _url("missing")}
+
+    df, errors = load_household(sheets, ttl=0)
+
+    # carol's sheet fails, the others are loaded and merged by date
+    assert list(errors) == ["carol"]
+    assert list(df.owner) == ["alice", "bob", "alice"]
+    assert list(df.index) == [0, 1, 2]
+    assert list(df.tags) == [["friends"], ["work"], []]
+
+    data = Dataset.from_transactions(df)
+    assert sorted(data.owners) == ["alice", "bob"]
+    bob = data.with_owners(["bob"])
+    assert list(bob.transactions.amount) == [30.0]
+    assert bob.cube.amount.sum() == 30.0
+    assert list(bob.tags.tag) == ["work"]
+
+
+def test_load_household_streaming(server, tmp_path, monkeypatch):
+    monkeypatch.setattr("visualizer._sheet_cache.path", tmp_path)
+    sheets = {"alice": _url("alice1"), "bob": _url("bob1")}
+
+    streamed, errors = load_household(sheets, ttl=0, streaming=True)
+
+    assert errors == {}
+
+    assert list(streamed.owner) == ["alice", "bob", "alice"]
+    assert list(streamed.amount) == [12.5, 30.0, 1000.0]
+
+
+def test_load_household_nothing_loaded(server, tmp_path, monkeypatch):
+    monkeypatch.setattr("visualizer._sheet_cache.path", tmp_path)
+
+    with pytest.raises(NoSheetLoaded) as info:
+        load_household({"carol": _url("missing")}, ttl=0)
+    assert list(info.value.errors) == ["carol"]
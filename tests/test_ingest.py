@@ -0,0 +1,66 @@
+import gc
+import io
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from ingest import ColumnStore, read_transactions
+from utility.artificial_data import generate
+from visualizer import load_data
+
+
+@pytest.fixture(scope="module")
+def sheet_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ingest") / "sheet.csv"
+    generate(50_000, "2015-01-01", "2024-12-31").to_csv(path, index=False)
+    return path
+
+
+def _traced(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def test_same_frame_as_load_data(sheet_csv):
+    chunked = read_transactions(sheet_csv, load_data, chunksize=7_000)
+    pd.testing.assert_frame_equal(chunked, load_data(pd.read_csv(sheet_csv, dtype=str)))
+
+
+def test_peak_memory_bound(sheet_csv):
+    df, current, peak = _traced(
+        lambda: read_transactions(sheet_csv, load_data, chunksize=5_000)
+    )
+    del df
+    _, _, full_peak = _traced(lambda: load_data(pd.read_csv(sheet_csv)))
+
+    # the final frame plus a chunk and a column being sorted
+    assert peak < 1.75 * current
+    assert peak < 0.75 * full_peak
+
+
+def test_header_only():
+    df = read_transactions(
+        io.StringIO("Date,Description,Category,Amount,Account,In main currency\n"),
+        load_data,
+    )
+    assert df.empty
+    assert "tags" in df.columns
+
+
+def test_column_store_sort():
+    store = ColumnStore()
+    store.append(pd.DataFrame({"date": [3, 1], "x": ["a", "b"]}, index=[0, 1]))
+    store.append(pd.DataFrame({"date": [2, 1], "x": ["c", "d"]}, index=[2, 3]))
+
+    df = store.to_frame(sort_by="date")
+
+    assert list(df.index) == [1, 3, 2, 0]
+    assert list(df.x) == ["b", "d", "c", "a"]
+    assert store.rows == 0
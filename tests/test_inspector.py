@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import page_by_amount, top_k_positions
+from visualizer import plot_dataframe
+
+
+@pytest.mark.parametrize("k", [0, 1, 7, 50, 99, 100, 150])
+def test_top_k_positions(k):
+    # few distinct values, many ties at every threshold
+    values = np.random.default_rng(k).integers(0, 10, 100).astype(float)
+
+    expected = np.argsort(-values, kind="stable")[:k]
+    np.testing.assert_array_equal(top_k_positions(values, k), expected)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5])
+def test_top_k_positions_nan_last(k):
+    values = np.array([1, np.nan, np.nan, 2, np.nan])
+
+    expected = pd.Series(values).sort_values(ascending=False, kind="stable").index[:k]
+    np.testing.assert_array_equal(top_k_positions(values, k), expected)
+
+
+def test_pages_cover_the_frame():
+    df = pd.DataFrame({"amount": np.random.default_rng(0).integers(0, 20, 95) / 2})
+
+    pages = [page_by_amount(df, page, 10) for page in range(10)]
+
+    assert [len(p) for p in pages] == [10] * 9 + [5]
+    merged = pd.concat(pages)
+    pd.testing.assert_frame_equal(merged, df.sort_values("amount", ascending=False, kind="stable"))
+
+
+def test_plot_dataframe_does_not_mutate():
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-01", "2024-01-02"]),
+            "amount": [1.0, 2.0],
+            "description": ["Pizza", []],
+        }
+    )
+    plot_dataframe(df)
+
+    assert df.description[1] == []
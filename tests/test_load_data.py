@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import convert_currency, detect_date_format, parse_dates, read_fx_rates
+from utility.artificial_data import CURRENCIES, fx_rates, generate
+from visualizer import load_data
+
+
+def _sheet() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "01/02/2024", "03/02/2024"],
+            "Description": ["Pizza #food #friends", np.nan, "Rent", "Pizza #food #friends"],
+            "Category": ["Food", "Salary", "Transfer", "Food"],
+            "Amount": ["-12,5", 1000.0, "-300", "-7,25"],
+            "Account": ["Cash", "HSBC", "HSBC", "Cash"],
+            "In main currency": ["-12,5", 1000.0, "-300", "-7,25"],
+        }
+    )
+
+
+def test_load_data():
+    df = load_data(_sheet())
+
+    assert list(df.columns) == [
+        "date", "category", "amount", "account", "description", "expense", "tags",
+        "year", "month",
+    ]
+    assert list(df.index) == [0, 1, 3]
+    assert list(df.date) == list(pd.to_datetime(["2024-01-15", "2024-01-16", "2024-02-03"]))
+    assert list(df.amount) == [12.5, 1000.0, 7.25]
+    assert list(df.expense) == [True, False, True]
+    assert list(df.tags) == [["food", "friends"], [], ["food", "friends"]]
+    # a missing description becomes an empty list
+    assert list(df.description) == ["Pizza  ", [], "Pizza  "]
+    assert list(df.year) == [2024, 2024, 2024]
+    assert list(df.month) == [1, 1, 2]
+
+
+def test_load_data_sorted_by_date():
+    sheet = _sheet().iloc[::-1]
+    df = load_data(sheet)
+
+    assert list(df.index) == [0, 1, 3]
+    assert df.date.is_monotonic_increasing
+
+
+def test_load_data_numeric_amounts():
+    sheet = _sheet().assign(Amount=[-12.5, 1000, -300, -7.25], Description=np.nan)
+    df = load_data(sheet)
+
+    assert df.amount.dtype == np.float64
+    assert list(df.amount) == [12.5, 1000.0, 7.25]
+    assert list(df.tags) == [[], [], []]
+
+
+def test_parse_dates():
+    dates = pd.Series(
+        ["15/01/2024", np.nan, "2024-01-02", "15/01/2024", "03/02/2024"],
+        index=[4, 3, 2, 1, 0],
+        name="date",
+    )
+    parsed = parse_dates(dates)
+
+    # the row in another format is parsed by the fallback, not day first
+    expected = pd.to_datetime(["2024-01-15", None, "2024-01-02", "2024-01-15", "2024-02-03"])
+    pd.testing.assert_series_equal(parsed, pd.Series(expected, index=dates.index, name="date"))
+
+
+def test_parse_dates_invalid():
+    with pytest.raises(ValueError):
+        parse_dates(pd.Series(["15/01/2024", "not a date"]))
+
+
+def test_detect_date_format():
+    assert detect_date_format(np.array(["15/01/2024", "31/12/2023"])) == "%d/%m/%Y"
+    assert detect_date_format(np.array(["2024-01-15", "2023-12-31"])) == "%Y-%m-%d"
+    assert detect_date_format(np.array(["Jan 15 2024", "Dec 31 2023"])) is None
+
+
+def test_load_data_main_currency():
+    sheet = _sheet().assign(
+        **{"In main currency": ["-13,75", np.nan, "-300", "-8"], "Currency": "USD"}
+    )
+    df = load_data(sheet)
+
+    # the amount is used where the main currency one is missing
+    assert list(df.amount) == [13.75, 1000.0, 8.0]
+    assert "currency" not in df and "in main currency" not in df
+
+
+def test_convert_currency():
+    rates = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-10", "2024-01-20", "2024-01-10"]),
+            "currency": ["USD", "USD", "GBP"],
+            "rate": [0.5, 0.25, 2.0],
+        }
+    )
+    dates = pd.Series(
+        pd.to_datetime(["2024-01-25", "2024-01-01", None, "2024-01-15", "2024-01-15", "2024-01-20"])
+    )
+    currencies = pd.Series(["USD", "USD", "USD", "GBP", "EUR", "USD"])
+    amount = pd.Series([100.0] * 6)
+
+    converted = convert_currency(amount, dates, currencies, rates)
+
+    # before the first rate the first one applies, no rate or no date as is
+    assert list(converted) == [25.0, 50.0, 100.0, 200.0, 100.0, 25.0]
+
+
+def test_load_data_fx_table(tmp_path):
+    sheet = generate(3_000, "2020-01-01", "2021-12-31", currencies=CURRENCIES[:4])
+    fx_rates(CURRENCIES[:4], "2020-01-01", "2021-12-31").to_csv(tmp_path / "fx.csv", index=False)
+    rates = read_fx_rates(tmp_path / "fx.csv")
+
+    expected = load_data(sheet)
+    converted = load_data(sheet.drop(columns="In main currency"), rates)
+
+    pd.testing.assert_index_equal(converted.index, expected.index)
+    np.testing.assert_allclose(converted.amount, expected.amount, rtol=1e-2)
+    assert (converted.expense == expected.expense).all()
+
+
+def test_read_fx_rates_invalid(tmp_path):
+    (tmp_path / "fx.csv").write_text("day,rate\n2024-01-01,1\n")
+    with pytest.raises(ValueError, match="currency, date"):
+        read_fx_rates(tmp_path / "fx.csv")
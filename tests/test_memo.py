@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from cache import Memo
+from dataset import Dataset
+from visualizer import incomes_expenses_section, load_data, trend_frames
+
+
+def _dataset() -> Dataset:
+    sheet = pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "03/02/2024", "04/02/2023"],
+            "Description": ["Pizza #food", "Train #work", "Cinema #friends", np.nan],
+            "Category": ["Food", "Transportation", "Fun", "Food"],
+            "Amount": ["-12,5", "-30", "-7,25", "-10"],
+            "Account": ["Cash", "HSBC", "Cash", "Cash"],
+        }
+    )
+    return Dataset.from_transactions(load_data(sheet))
+
+
+def test_memo_lru():
+    memo = Memo(maxsize=2)
+    calls = []
+    compute = lambda key: lambda: calls.append(key) or key
+
+    assert memo.get_or_compute("a", compute("a")) == "a"
+    memo.get_or_compute("b", compute("b"))
+    memo.get_or_compute("a", compute("a"))
+    memo.get_or_compute("c", compute("c"))  # evicts b, a was used more recently
+    memo.get_or_compute("a", compute("a"))
+
+    assert calls == ["a", "b", "c"]
+    assert (memo.hits, memo.misses, len(memo)) == (2, 3, 2)
+
+
+def test_trend_frames():
+    data = _dataset()
+    df, tags = data.side(expense=True)
+
+    trend, totals = trend_frames(df, tags, "Year", 2024, ignored_tags=["work"])
+
+    assert list(trend.columns) == ["date", "category", "amount"]
+    assert trend.amount.sum() == 19.75
+    assert list(totals.category) == ["Fun", "Food"]
+    assert list(totals.amount) == [7.25, 12.5]
+
+    _, totals = trend_frames(df, tags, "Year", 2024, dont_consider_accounts=["Cash"])
+    assert list(totals.category) == ["Transportation"]
+
+
+def test_section_memoized():
+    data = _dataset()
+
+    # bare mode, the widgets keep their default value
+    incomes_expenses_section(data, "expenses")
+    incomes_expenses_section(data, "expenses")
+
+    assert (data.memo.misses, data.memo.hits) == (1, 1)
@@ -0,0 +1,63 @@
+import json
+
+import pandas as pd
+
+import profiling
+
+
+def test_disabled_profiler_records_nothing(tmp_path):
+    profiler = profiling.start(False)
+    with profiling.stage("load") as s:
+        s.output(pd.DataFrame({"a": [1, 2]}))
+
+    assert profiler.records() == []
+    profiler.write(tmp_path / "perf.jsonl")
+    assert not (tmp_path / "perf.jsonl").exists()
+
+
+def test_enabled_profiler(tmp_path):
+    profiler = profiling.start(True)
+    with profiling.stage("load", rows=10) as s:
+        s.output(pd.DataFrame({"a": range(4)}))
+    with profiling.stage("section", rows=4):
+        with profiling.stage("tab"):
+            pass
+
+    records = profiler.records()
+    assert [(r["name"], r["depth"]) for r in records] == [
+        ("load", 0), ("section", 0), ("tab", 1)
+    ]
+    assert records[0]["rows"] == 4 and records[0]["bytes"] > 0
+    assert records[1]["rows"] == 4 and records[1]["bytes"] is None
+    assert all(r["seconds"] >= 0 for r in records)
+
+    profiler.write(tmp_path / "perf.jsonl")
+    profiler.write(tmp_path / "perf.jsonl")
+    lines = (tmp_path / "perf.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["stages"] == records
+
+
+def test_fragment_rerun_profiled_on_its_own(tmp_path):
+    log = tmp_path / "perf.jsonl"
+    rerun = profiling.start(True)
+
+    # a fragment run by the rerun of the script adds to its profiler
+    with profiling.profiled(True, log) as profiler:
+        with profiling.stage("section"):
+            pass
+    assert profiler is rerun
+    assert not log.exists()
+    rerun.finish(log)
+
+    # a fragment rerun gets a profiler and a line of its own
+    with profiling.profiled(True, log) as profiler:
+        with profiling.stage("section"):
+            pass
+    assert profiler is not rerun
+    assert profiling.current() is rerun
+    assert [r["name"] for r in rerun.records()] == ["section"]
+
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    stages = [[s["name"] for s in line["stages"]] for line in lines]
+    assert stages == [["section"], ["section"]]
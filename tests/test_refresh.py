@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from refresh import Refresher, Refreshers
+
+
+class Source:
+    """Counts the loads, fails while ``down``"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.loads = []
+        self.down = False
+
+    def __call__(self, refresh: bool):
+        time.sleep(self.delay)
+        if self.down:
+            raise ValueError("down")
+        self.loads.append(refresh)
+        return len(self.loads), {}
+
+
+def _wait(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_first_load_once():
+    source = Source(delay=0.1)
+    worker = Refresher(source)
+
+    with ThreadPoolExecutor(4) as pool:
+        snapshots = list(pool.map(lambda _: worker.snapshot(), range(4)))
+
+    # concurrent first reads share the load, from the cache
+    assert source.loads == [False]
+    assert {s.version for s in snapshots} == {1}
+    assert snapshots[0].data == 1
+    worker.stop()
+
+
+def test_scheduled_refresh():
+    source = Source()
+    worker = Refresher(source, interval=0.05)
+
+    first = worker.snapshot()
+    _wait(lambda: worker.snapshot().version >= 3)
+
+    # the reader kept its snapshot, a new one was swapped in
+    assert first.version == 1 and first.data == 1
+    assert source.loads[1:3] == [True, True]
+    assert worker.snapshot().loaded_at > first.loaded_at
+    worker.stop()
+
+
+def test_failed_refresh_keeps_snapshot():
+    source = Source()
+    worker = Refresher(source)
+    worker.snapshot()
+
+    source.down = True
+    assert worker.refresh_now(timeout=5)
+    assert worker.snapshot().version == 1
+    assert str(worker.error) == "down"
+    assert worker.failed_at is not None
+
+    source.down = False
+    assert worker.refresh_now(timeout=5)
+    assert worker.snapshot().version == 2
+    assert worker.error is None
+    worker.stop()
+
+
+def test_first_load_failure():
+    source = Source()
+    source.down = True
+    worker = Refresher(source)
+
+    with pytest.raises(ValueError):
+        worker.snapshot()
+    assert not worker.ready
+
+    # retried at the next read
+    source.down = False
+    assert worker.snapshot().version == 1
+
+
+def test_idle_worker_stops():
+    workers = Refreshers(max_idle=0.1)
+    worker = workers.get("alice", Source(), interval=None)
+    worker.snapshot()
+
+    _wait(lambda: worker.stopped)
+    assert not worker.ready
+    assert not worker.refresh_now()
+    # the next read of the source starts a new worker
+    assert workers.get("alice", Source()) is not worker
+
+
+def test_unread_worker_stops():
+    source = Source()
+    worker = Refresher(source, interval=0.05)
+    worker.snapshot()
+
+    # nobody reads it, it stops at the next refresh instead of loading again
+    _wait(lambda: worker.stopped)
+    assert source.loads == [False]
+    assert not worker.ready
+
+
+def test_released_snapshot_reloaded():
+    source = Source()
+    workers = Refreshers()
+    worker = workers.get("alice", source)
+    first = worker.snapshot()
+
+    workers.release("evicted", object())
+    assert worker.snapshot() is first
+    workers.release("evicted", first.data)
+    assert not worker.ready
+
+    # the next read loads it again, with a new version
+    assert worker.snapshot().version == 2
+    assert source.loads == [False, False]
+    workers.stop()
+
+
+def test_refreshers_shared():
+    workers = Refreshers()
+    source = Source()
+
+    alice = workers.get("alice", source, interval=60)
+    assert workers.get("alice", Source(), interval=120) is alice
+    assert alice.interval == 120
+    assert workers.get("bob", Source()) is not alice
+    assert len(workers) == 2
+
+    alice.snapshot()
+    workers.stop()
+    _wait(lambda: not any(t.name == "refresh alice" for t in threading.enumerate()))
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import Dataset, SearchIndex
+from engine import load_data
+
+
+@pytest.fixture
+def data() -> Dataset:
+    sheet = pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "03/02/2024", "04/02/2023", "05/02/2023"],
+            "Description": [
+                "Pizza Napoli #food #friends",
+                "Train to Milan #work",
+                "Pizzeria da Mario #family",
+                np.nan,
+                "Milano market",
+            ],
+            "Category": ["Food", "Transportation", "Food", "Food", "Food"],
+            "Amount": ["-12,5", "-30", "-40", "-10", "-5"],
+            "Account": ["Cash", "HSBC", "Cash", "Cash", "Cash"],
+        },
+        index=[10, 11, 12, 13, 14],
+    )
+    return Dataset.from_transactions(load_data(sheet))
+
+
+@pytest.mark.parametrize(
+    "query, rows",
+    [
+        ("pizza", [10]),
+        ("piz", [10, 12]),
+        ("PIZ", [10, 12]),
+        ("mil", [11, 14]),
+        ("milan", [11, 14]),
+        ("milan train", [11]),
+        ("fam", [12]),
+        ("#fam", [12]),
+        ("#pizza", []),
+        ("f", [10, 12]),
+        ("pizza friends", [10]),
+        ("zzz", []),
+    ],
+)
+def test_search(data, query, rows):
+    assert sorted(data.search.rows(query)) == rows
+
+
+def test_empty_query(data):
+    assert data.search.mask("  ") is None
+    assert len(data.search.rows("")) == 5
+
+
+def test_compact_same_results(data):
+    compact = Dataset.from_transactions(data.transactions, compact=True)
+    for query in ("piz", "#f", "milan", "mario pizz"):
+        np.testing.assert_array_equal(
+            np.sort(compact.search.rows(query)), np.sort(data.search.rows(query))
+        )
+
+
+def test_empty_frame(data):
+    search = SearchIndex(data.transactions.iloc[:0], data.tags)
+    assert len(search.rows("pizza")) == 0
+
+
+def test_hyphens():
+    sheet = pd.DataFrame(
+        {
+            "Date": ["15/01/2024", "16/01/2024", "17/01/2024"],
+            "Description": ["Flight #trip-2024 #foo-bar", "E-mail backup #foo", "Mail #bar"],
+            "Category": ["Travel", "Bills", "Bills"],
+            "Amount": ["-100", "-5", "-3"],
+            "Account": ["Cash", "Cash", "Cash"],
+        }
+    )
+    search = Dataset.from_transactions(load_data(sheet)).search
+
+    # a tag is found by its own name, hyphens included
+    assert list(search.rows("#foo-bar")) == [0]
+    assert list(search.rows("#trip-2024")) == [0]
+    assert list(search.rows("foo-b")) == [0]
+    assert sorted(search.rows("#foo")) == [0, 1]
+    # hyphenated words are found whole or by their parts
+    assert list(search.rows("e-mail")) == [1]
+    assert sorted(search.rows("mail")) == [1, 2]
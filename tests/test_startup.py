@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from utils import InvalidSheetUrl, extract_sheet_id
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+
+def test_import_is_lazy():
+    script = "import visualizer, sys; print(*sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=SRC, capture_output=True, text=True, check=True
+    )
+
+    modules = result.stdout.split()
+    assert "pandas" not in modules
+    assert "numpy" not in modules
+    assert "gspread" not in modules
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://docs.google.com/spreadsheets/d/1aB-c_9/edit#gid=0",
+        "https://docs.google.com/spreadsheets/d/1aB-c_9",
+        "https://docs.google.com/spreadsheet/ccc?key=1aB-c_9&usp=sharing",
+    ],
+)
+def test_extract_sheet_id(url):
+    assert extract_sheet_id(url) == "1aB-c_9"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://example.com/sheet",
+        "https://docs.google.com/spreadsheet/ccc?key=../x",
+        "https://docs.google.com/spreadsheet/ccc?key=..%2F..%2Fx&usp=sharing",
+        "https://docs.google.com/spreadsheet/ccc?key=abc/../../x",
+    ],
+)
+def test_extract_sheet_id_invalid(url):
+    with pytest.raises(InvalidSheetUrl):
+        extract_sheet_id(url)
+
+
+def test_cache_files_stay_in_cache_dir(tmp_path):
+    from cache import SheetCache
+    from visualizer import sheet_key
+
+    cache = SheetCache(tmp_path / "cache")
+    victim = tmp_path / "victim.parquet"
+    victim.write_bytes(b"data")
+
+    # an invalid URL never names a file, a crafted key is refused
+    assert "/" not in sheet_key("../victim") and ".." not in sheet_key("../victim")
+    with pytest.raises(ValueError):
+        cache.invalidate("../victim")
+    with pytest.raises(ValueError):
+        cache.get(f"../{tmp_path.name}/victim")
+    assert victim.exists()
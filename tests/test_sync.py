@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from cache import SheetCache
+from sync import sync_sheet
+from utility.fake_sheet_server import run_query
+
+_HEADER = "Date,Description,Category,Amount,Account,In main currency\n"
+
+
+def _rows(start: int, stop: int) -> str:
+    return "".join(
+        f'{day:02d}/01/2024,Row {day} #tag{day % 3},Food,"-{day},5",Cash,"-{day},5"\n'
+        for day in range(start, stop)
+    )
+
+
+@pytest.fixture
+def sheets():
+    return {"sheet1": _HEADER + _rows(1, 11)}
+
+
+def test_run_query():
+    text = _HEADER + _rows(1, 11)
+    assert run_query(text, "select * offset 8") == _HEADER + _rows(9, 11)
+    assert run_query(text, "select * limit 2 offset 1").count("\n") == 3
+    assert run_query(text, "select count(A)").splitlines()[1] == "10"
+    with pytest.raises(ValueError):
+        run_query(text, "select B where A > 1")
+
+
+def test_first_sync_is_full(server):
+    result = sync_sheet("sheet1")
+
+    assert result.full
+    assert result.new_rows == len(result.frame) == 10
+    assert server.queries == []
+
+
+def test_appended_rows_only(server):
+    stored = sync_sheet("sheet1").frame
+    server.sheets["sheet1"] += _rows(11, 14)
+
+    result = sync_sheet("sheet1", stored, overlap=2)
+
+    assert not result.full
+    assert result.new_rows == 3
+    assert server.queries == ["select * offset 8"]
+    pd.testing.assert_frame_equal(result.frame, sync_sheet("sheet1").frame)
+
+
+def test_nothing_new(server):
+    stored = sync_sheet("sheet1").frame
+    result = sync_sheet("sheet1", stored)
+
+    assert not result.full
+    assert result.new_rows == 0
+    assert result.frame is stored
+
+
+@pytest.mark.parametrize(
+    "sheet",
+    [
+        _HEADER + _rows(1, 8),  # rows deleted, the sheet shrunk
+        _HEADER + _rows(1, 9) + _rows(20, 25),  # last rows edited
+    ],
+)
+def test_full_resync_when_changed(server, sheet):
+    stored = sync_sheet("sheet1").frame
+    server.sheets["sheet1"] = sheet
+
+    result = sync_sheet("sheet1", stored, overlap=3)
+
+    assert result.full
+    assert result.new_rows == len(result.frame) == len(sheet.splitlines()) - 1
+
+
+def test_sync_from_disk_store(server, tmp_path):
+    # the stored rows went through parquet, missing cells included
+    server.sheets["sheet1"] += "11/01/2024,,Food,-1,Cash,-1\n"
+    SheetCache(tmp_path).put("sheet1", sync_sheet("sheet1").frame)
+    stored = SheetCache(tmp_path).get("sheet1")
+
+    server.sheets["sheet1"] += _rows(12, 13)
+    result = sync_sheet("sheet1", stored)
+
+    assert not result.full
+    assert result.new_rows == 1
+    assert len(result.frame) == 12
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from dataset import build_tag_table
+from visualizer import aggregate_tags_values
+
+
+def _transactions() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "amount": [10.0, 20.0, 30.0, 40.0],
+            "tags": [["food", "friends"], [], ["food"], ["trip", "friends"]],
+        },
+        index=[3, 5, 8, 9],
+    )
+
+
+def test_build_tag_table():
+    tags = build_tag_table(_transactions())
+
+    assert list(tags.row) == [3, 3, 8, 9, 9]
+    assert list(tags.tag) == ["food", "friends", "food", "trip", "friends"]
+    assert list(tags.tag.cat.categories) == ["food", "friends", "trip"]
+
+
+def test_aggregate_tags_values():
+    df = _transactions()
+    summary = aggregate_tags_values(df)
+
+    assert list(summary.tag) == ["🏷️ food", "🏷️ friends", "🏷️ trip"]
+    assert list(summary.value) == [40.0, 50.0, 40.0]
+    assert list(summary.impact) == [40.0, 50.0, 40.0]
+
+    # a precomputed table of a larger frame gives the same result
+    table = build_tag_table(pd.concat([df, df.set_axis([10, 11, 12, 13])]))
+    pd.testing.assert_frame_equal(aggregate_tags_values(df, table), summary)
+
+
+def test_aggregate_tags_values_no_tags():
+    df = _transactions().iloc[[1]]
+    assert aggregate_tags_values(df).empty